@@ -27,7 +27,15 @@ from google.genai import types
 from app.prompts.analyst_agent.strong import PROMPT_ANALYST_AGENT_STRONG
 from app.prompts.cypher_agent.strong import PROMPT_CYPHER_AGENT_STRONG
 from app.prompts.root_agent.strong import PROMPT_ROOT_AGENT_STRONG
-from app.tools import get_graph_schema, run_cypher_query, save_html_dashboard
+from app.async_tools import (
+    get_co_purchases,
+    get_customer_segments,
+    get_graph_schema,
+    run_cypher_queries,
+    run_cypher_query,
+    run_graph_aggregate,
+)
+from app.tools import save_html_dashboard
 
 _, project_id = google.auth.default()
 os.environ["GOOGLE_CLOUD_PROJECT"] = project_id
@@ -45,6 +53,9 @@ cypher_builder_agent = Agent(
     tools=[
         LongRunningFunctionTool(func=get_graph_schema),
         LongRunningFunctionTool(func=run_cypher_query),
+        LongRunningFunctionTool(func=run_cypher_queries),
+        LongRunningFunctionTool(func=run_graph_aggregate),
+        LongRunningFunctionTool(func=get_co_purchases),
     ],
 )
 
@@ -57,6 +68,7 @@ analyst_agent = Agent(
     instruction=PROMPT_ANALYST_AGENT_STRONG,
     tools=[
         LongRunningFunctionTool(func=save_html_dashboard),
+        LongRunningFunctionTool(func=get_customer_segments),
     ],
 )
 
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import asyncio
+import atexit
 import logging
 import os
 from typing import Any
@@ -32,6 +33,7 @@ from vertexai.preview.reasoning_engines import A2aAgent
 from app.agent import app as adk_app
 from app.app_utils.telemetry import setup_telemetry
 from app.app_utils.typing import Feedback
+from app.neo4j_driver import close_drivers
 
 # Load environment variables from .env file at runtime
 load_dotenv()
@@ -100,6 +102,10 @@ class AgentEngineApp(A2aAgent):
         self.logger = logging_client.logger(__name__)
         if gemini_location:
             os.environ["GOOGLE_CLOUD_LOCATION"] = gemini_location
+        # Tools create Neo4j drivers on first use: the async driver per event
+        # loop, the sync one only for work offloaded to threads. Close every
+        # pool on shutdown.
+        atexit.register(close_drivers)
 
     def register_feedback(self, feedback: dict[str, Any]) -> None:
         """Collect and log feedback."""
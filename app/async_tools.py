@@ -0,0 +1,380 @@
+import asyncio
+import contextlib
+import uuid
+
+from google.adk.tools import ToolContext
+from neo4j import READ_ACCESS, unit_of_work
+
+from app.co_purchase import CO_PURCHASE_BUILD_TIMEOUT, co_purchase_payload
+from app.cypher_guard import (
+    CYPHER_GUARD_MODE,
+    rejection_error,
+    review_plan,
+    should_review,
+)
+from app.data_version import current_data_version_async
+from app.graph_schema import get_schema_text_async
+from app.local_graph import aggregate_cypher, local_aggregate, parse_aggregate
+from app.neo4j_driver import NEO4J_DATABASE, async_session
+from app.query_batch import (
+    BATCH_DEADLINE_GRACE,
+    batch_budget,
+    batch_error,
+    batch_names,
+    render_batch,
+)
+from app.query_control import (
+    cancel_queries_async,
+    classify_error,
+    error_payload,
+    query_metadata,
+    resolve_timeout,
+    timeout_error,
+)
+from app.query_results import (
+    QUERY_MAX_BYTES,
+    QUERY_MAX_ROWS,
+    QUERY_RESULT_FORMAT,
+    ResultCollector,
+    collect_result_async,
+)
+from app.result_cache import ResultCache, cacheable_query, result_cache
+from app.rfm import RFM_BUILD_TIMEOUT, rfm_payload
+
+
+async def _explain_plan(tx, query: str) -> dict:
+    # EXPLAIN only plans the query; the plan is cached for the real run.
+    summary = await (await tx.run(f"EXPLAIN {query}")).consume()
+    return summary.plan
+
+
+async def _read_rows(tx, query: str, hints: list[str], budget: tuple[int, int]) -> str:
+    # Managed transactions may retry, so each attempt starts a fresh collector.
+    collector = ResultCollector(max_rows=budget[0], max_bytes=budget[1])
+    collector.hints = list(hints)
+    return await collect_result_async(await tx.run(query), collector)
+
+
+async def _execute_read_query(
+    neo4j_session, query: str, timeout: float, metadata: dict, budget: tuple[int, int]
+) -> tuple[str, bool]:
+    """Runs the cost guard and the query in read transactions.
+
+    Returns:
+        The payload and whether it is a result (True) or a guard rejection.
+    """
+    hints: list[str] = []
+    if should_review(query):
+        plan = await neo4j_session.execute_read(
+            unit_of_work(timeout=timeout, metadata=metadata)(_explain_plan), query
+        )
+        review = review_plan(query, plan, max_rows=budget[0])
+        if review.rejected:
+            return rejection_error(review), False
+        query, hints = review.query, review.hints
+    payload = await neo4j_session.execute_read(
+        unit_of_work(timeout=timeout, metadata=metadata)(_read_rows),
+        query,
+        hints,
+        budget,
+    )
+    return payload, True
+
+
+async def _run_query(
+    query: str,
+    use_cache: bool,
+    timeout: float,
+    invocation_id: str | None,
+    budget: tuple[int, int] = (QUERY_MAX_ROWS, QUERY_MAX_BYTES),
+    query_id: str | None = None,
+) -> str:
+    """Serves one query from the result cache or runs it within `budget`
+    (max rows, max bytes). Failures come back as structured errors.
+    `query_id` tags the transaction so it can be terminated on its own."""
+    try:
+        cache_key = None
+        normalized = cacheable_query(query, use_cache)
+        if normalized is not None:
+            cache_key = ResultCache.make_key(
+                NEO4J_DATABASE,
+                await current_data_version_async(NEO4J_DATABASE),
+                normalized,
+                # Anything that changes the rendered payload is part of the key.
+                variant=(
+                    f"{QUERY_RESULT_FORMAT}:{CYPHER_GUARD_MODE}:{budget[0]}:{budget[1]}"
+                ),
+            )
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        async with async_session(
+            database=NEO4J_DATABASE, default_access_mode=READ_ACCESS
+        ) as neo4j_session:
+            payload, ok = await _execute_read_query(
+                neo4j_session,
+                query,
+                timeout,
+                query_metadata(invocation_id, query_id),
+                budget,
+            )
+        if ok and cache_key is not None:
+            result_cache.put(cache_key, payload)
+        return payload
+    except Exception as e:
+        return classify_error(e, timeout)
+
+
+async def _terminate_on_cancel(
+    invocation_id: str | None, query_ids: list[str] | None = None
+) -> None:
+    # The invocation (or some batch members) was abandoned: make sure the
+    # server stops working too.
+    if invocation_id or query_ids:
+        with contextlib.suppress(Exception):
+            await asyncio.shield(
+                cancel_queries_async(invocation_id, query_ids=query_ids)
+            )
+
+
+async def run_cypher_query(
+    query: str,
+    use_cache: bool = True,
+    timeout_seconds: float | None = None,
+    tool_context: ToolContext | None = None,
+) -> str:
+    """Executes a Cypher query against the Neo4j database and returns the results.
+
+    Rows are streamed and serialized until QUERY_MAX_ROWS rows or
+    QUERY_MAX_BYTES bytes have been collected; larger results are truncated.
+    Read-only results are cached per normalized query and data version.
+    The query runs in a managed read transaction, so it is routed to read
+    replicas in a cluster, retried on transient errors, refused by the server
+    if it tries to write, and aborted after the timeout.
+    Depending on CYPHER_GUARD_MODE, an EXPLAIN pre-flight first adds plan
+    hints, injects a LIMIT into unbounded results, or rejects risky plans.
+
+    Args:
+        query: The Cypher query to execute.
+        use_cache: Set to False to bypass the result cache and re-run the query.
+        timeout_seconds: Server-side timeout; defaults to QUERY_TIMEOUT and is
+            capped at QUERY_MAX_TIMEOUT.
+        tool_context: Injected by ADK; abandoning the invocation terminates
+            the query on the server.
+
+    Returns:
+        Compact JSON with "columns" and "rows". When the result was cut short it
+        also carries "truncated": true and "total_rows" (or
+        "total_rows_at_least" when counting stopped early). Timeouts and
+        cancellations return {"error": "timeout" | "cancelled", "message": ...},
+        writes return {"error": "read_only", ...};
+        rejected plans return {"error": "rejected", "hints": [...], ...};
+        other failures return {"error": "query_failed", "message": ...}.
+    """
+    invocation_id = tool_context.invocation_id if tool_context else None
+    try:
+        return await _run_query(
+            query, use_cache, resolve_timeout(timeout_seconds), invocation_id
+        )
+    except asyncio.CancelledError:
+        await _terminate_on_cancel(invocation_id)
+        raise
+
+
+async def run_cypher_queries(
+    queries: list[str],
+    names: list[str] | None = None,
+    use_cache: bool = True,
+    timeout_seconds: float | None = None,
+    tool_context: ToolContext | None = None,
+) -> str:
+    """Executes several independent read-only Cypher queries concurrently.
+
+    Use this for dashboards that need multiple aggregates (KPIs, a chart
+    series, tables) instead of calling run_cypher_query once per query. All
+    queries share one time budget and split the row/byte budget between them.
+
+    Args:
+        queries: The Cypher queries to execute (at most QUERY_BATCH_MAX_QUERIES).
+        names: Optional result names, one per query, e.g. ["kpis", "by_city"].
+            Defaults to "query_1", "query_2", ...
+        use_cache: Set to False to bypass the result cache and re-run queries.
+        timeout_seconds: Shared time budget; defaults to QUERY_TIMEOUT and is
+            capped at QUERY_MAX_TIMEOUT.
+        tool_context: Injected by ADK; abandoning the invocation terminates
+            the queries on the server.
+
+    Returns:
+        A JSON object mapping each name to that query's run_cypher_query
+        payload or structured error.
+    """
+    invalid = batch_error(queries, names)
+    if invalid:
+        return invalid
+    names = batch_names(queries, names)
+    timeout = resolve_timeout(timeout_seconds)
+    budget = batch_budget(len(queries))
+    invocation_id = tool_context.invocation_id if tool_context else None
+    # Each member is tagged with its own id, so members that miss the
+    # deadline are terminated without touching finished ones or other tool
+    # calls of the same invocation.
+    batch_id = uuid.uuid4().hex
+    query_ids = {name: f"{batch_id}:{name}" for name in names}
+
+    tasks = {
+        asyncio.ensure_future(
+            _run_query(
+                query, use_cache, timeout, invocation_id, budget, query_ids[name]
+            )
+        ): name
+        for name, query in zip(names, queries, strict=True)
+    }
+    try:
+        # The server enforces the timeout; the grace covers pool acquisition.
+        done, pending = await asyncio.wait(
+            tasks, timeout=timeout + BATCH_DEADLINE_GRACE
+        )
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await _terminate_on_cancel(invocation_id, list(query_ids.values()))
+        raise
+
+    payloads = {tasks[task]: task.result() for task in done}
+    for task in pending:
+        task.cancel()
+        payloads[tasks[task]] = timeout_error(timeout)
+    if pending:
+        await _terminate_on_cancel(
+            invocation_id, [query_ids[tasks[task]] for task in pending]
+        )
+    return render_batch(names, payloads)
+
+
+async def run_graph_aggregate(
+    metric: str,
+    group_by: list[str] | None = None,
+    filters: list[str] | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    limit: int = 20,
+    tool_context: ToolContext | None = None,
+) -> str:
+    """Computes a common transaction aggregate without hand-written Cypher.
+
+    When LOCAL_GRAPH_PATH points at the file neo4j_ingest.py loaded, the
+    aggregate is answered in-process from an array-backed copy of the graph;
+    otherwise the equivalent Cypher runs on Neo4j like run_cypher_query.
+    The local copy only holds that file, so after incremental loads from
+    other files it lags behind Neo4j until LOCAL_GRAPH_PATH covers them.
+
+    Args:
+        metric: "revenue", "transactions", "items", "avg_basket" or "customers".
+        group_by: Dimensions to group by, from "city", "store_type", "customer",
+            "customer_category", "product", "season", "payment_method", "year",
+            "month" and "week". Groups are sorted by the metric, largest first.
+        filters: Conditions like "season=Winter" or "year=2023"; repeat a
+            dimension to allow several values.
+        start_date: Earliest transaction date, YYYY-MM-DD (inclusive).
+        end_date: Latest transaction date, YYYY-MM-DD (inclusive).
+        limit: Most groups returned (capped at AGGREGATE_MAX_LIMIT).
+        tool_context: Injected by ADK; ties a Neo4j query to its invocation.
+
+    Returns:
+        JSON like run_cypher_query's, with one column per group_by dimension
+        followed by the metric. Invalid arguments return
+        {"error": "invalid_aggregate", "message": ...}.
+    """
+    try:
+        query = parse_aggregate(metric, group_by, filters, start_date, end_date, limit)
+    except ValueError as e:
+        return error_payload("invalid_aggregate", str(e))
+    # Loading or scanning the arrays is CPU-bound; keep it off the event loop.
+    payload = await asyncio.to_thread(local_aggregate, query)
+    if payload is not None:
+        return payload
+    invocation_id = tool_context.invocation_id if tool_context else None
+    try:
+        return await _run_query(
+            aggregate_cypher(query), True, resolve_timeout(None), invocation_id
+        )
+    except asyncio.CancelledError:
+        await _terminate_on_cancel(invocation_id)
+        raise
+
+
+async def get_co_purchases(
+    product: str | None = None,
+    top_k: int = 10,
+    sort_by: str = "lift",
+    min_count: int = 2,
+) -> str:
+    """Finds products bought together, without a CONTAINS self-join.
+
+    Co-occurrence counts over all baskets are computed once per data version
+    (or local graph load) and cached, so lookups take milliseconds.
+
+    Args:
+        product: Product name to find companions for. Omit to get the top
+            product pairs overall.
+        top_k: Number of rows to return (capped at CO_PURCHASE_MAX_K).
+        sort_by: "lift" (default), "confidence", "count" or "support".
+        min_count: Ignore pairs seen in fewer baskets; raise it to keep
+            lift from favouring rare products.
+
+    Returns:
+        JSON like run_cypher_query's with columns "product" (or "product_a"
+        and "product_b"), "count", "support", "confidence" and "lift".
+        Unknown products return {"error": "unknown_product", "suggestions": [...]}.
+    """
+    try:
+        return await asyncio.to_thread(
+            co_purchase_payload, product, top_k, sort_by, min_count
+        )
+    except Exception as e:
+        return classify_error(e, CO_PURCHASE_BUILD_TIMEOUT)
+
+
+async def get_customer_segments(segment: str | None = None, top_k: int = 10) -> str:
+    """Segments customers by recency, frequency and monetary value (RFM).
+
+    Each customer gets 1-5 quantile scores for recency (days since their last
+    purchase, counted back from the latest date in the data), frequency
+    (transactions) and monetary value (total spend). The scores map to
+    segments such as "Champions", "Loyal", "At Risk" and "Hibernating".
+    Scores are computed once per data version and cached.
+
+    Args:
+        segment: Segment to list customers for. Omit to get the summary of
+            all segments.
+        top_k: Customers to list for `segment`, highest spend first (capped at
+            RFM_MAX_K).
+
+    Returns:
+        JSON like run_cypher_query's. The summary has one row per segment:
+        customers, revenue, their shares, and average recency, frequency and
+        spend. A segment lists its customers with their "rfm" score string,
+        e.g. "545". Unknown segments return
+        {"error": "unknown_segment", "segments": [...]}.
+    """
+    try:
+        return await asyncio.to_thread(rfm_payload, segment, top_k)
+    except Exception as e:
+        return classify_error(e, RFM_BUILD_TIMEOUT)
+
+
+async def get_graph_schema() -> str:
+    """Retrieves the schema of the Neo4j database, including node labels,
+    relationship types with their endpoints, and typed property keys.
+
+    The schema is cached per database and refreshed after SCHEMA_CACHE_TTL
+    seconds or when ingestion invalidates it.
+
+    Returns:
+        A string describing the schema.
+    """
+    try:
+        return await get_schema_text_async(NEO4J_DATABASE)
+    except Exception as e:
+        return f"Error retrieving schema: {e!s}"
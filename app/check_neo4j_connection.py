@@ -1,10 +1,16 @@
+import argparse
 import os
 import sys
 
 from neo4j import GraphDatabase, exceptions
 
+if __package__:
+    from app.neo4j_indexes import check_schema, has_drift
+else:
+    from neo4j_indexes import check_schema, has_drift
 
-def check_connection():
+
+def check_connection(check_indexes=False):
     # Default to standard Neo4j Desktop ports/creds if env vars not set
     uri = os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687")
     user = os.getenv("NEO4J_USER", "neo4j")
@@ -31,6 +37,17 @@ def check_connection():
             msg = result.single()["message"]
             print(f"✅ Database responded: {msg}")
 
+        if check_indexes:
+            drift = check_schema(driver, database)
+            if has_drift(drift):
+                print("⚠️  Constraints/indexes drift from the declared schema:")
+                for kind, names in drift.items():
+                    if names:
+                        print(f"   {kind}: {', '.join(names)}")
+                print("   Run `python app/neo4j_indexes.py --apply` to fix.")
+            else:
+                print("✅ Constraints and indexes match the declared schema")
+
         driver.close()
         return True
     except exceptions.ServiceUnavailable:
@@ -48,5 +65,11 @@ def check_connection():
 
 
 if __name__ == "__main__":
-    # Remove the hardcoded test logic and simply call the main function
-    check_connection()
+    parser = argparse.ArgumentParser(description="Check the Neo4j connection.")
+    parser.add_argument(
+        "--indexes",
+        action="store_true",
+        help="also report constraint/index drift against the declared schema",
+    )
+    args = parser.parse_args()
+    sys.exit(0 if check_connection(check_indexes=args.indexes) else 1)
@@ -0,0 +1,208 @@
+import difflib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from neo4j import READ_ACCESS, unit_of_work
+
+from app.local_graph import DerivedCache, basket_matrix
+from app.neo4j_driver import NEO4J_DATABASE, session
+from app.query_control import error_payload
+from app.query_results import ResultCollector
+
+logger = logging.getLogger(__name__)
+
+# Server-side timeout for reading every basket when the index is (re)built.
+CO_PURCHASE_BUILD_TIMEOUT = float(os.getenv("CO_PURCHASE_BUILD_TIMEOUT", "300"))
+CO_PURCHASE_MAX_K = int(os.getenv("CO_PURCHASE_MAX_K", "100"))
+
+SORT_KEYS = ("lift", "confidence", "count", "support")
+
+_BASKETS_QUERY = """
+MATCH (t:Transaction)
+WITH [(t)-[:CONTAINS]->(p:Product) | p.name] AS products
+WHERE size(products) > 0
+RETURN products
+"""
+
+
+def _pairs(indptr: np.ndarray, items: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Every unordered product pair within each basket, as (a, b) with a < b.
+
+    This is the upper triangle of X^T X for the incidence matrix X, built
+    from one block per basket size so it stays vectorized.
+    """
+    lengths = np.diff(indptr)
+    firsts, seconds = [], []
+    for size in np.unique(lengths[lengths >= 2]):
+        starts = indptr[:-1][lengths == size][:, None]
+        i, j = np.triu_indices(int(size), 1)
+        firsts.append(items[starts + i].ravel())
+        seconds.append(items[starts + j].ravel())
+    if not firsts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+class CoPurchaseIndex:
+    """Co-occurrence counts of products bought together, with the usual
+    market-basket measures.
+
+    For products x and y over N baskets: support = n(x,y) / N, confidence
+    (x -> y) = n(x,y) / n(x), lift = n(x,y) * N / (n(x) * n(y)). Pairs are
+    stored in both directions in CSR form, so the partners of one product
+    are a contiguous slice.
+    """
+
+    def __init__(self, indptr: np.ndarray, items: np.ndarray, names: list[str]):
+        self.names = list(names)
+        self.index = {name: code for code, name in enumerate(self.names)}
+        width = max(len(self.names), 1)
+        self.baskets = int(np.count_nonzero(np.diff(indptr)))
+        self.item_counts = np.bincount(items, minlength=len(self.names))
+
+        first, second = _pairs(indptr, items)
+        keys = np.sort(first * width + second)
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        counts = np.diff(np.append(starts, len(keys)))
+        self.pair_a, self.pair_b = np.divmod(keys[starts], width)
+        self.pair_count = counts
+
+        source = np.concatenate([self.pair_a, self.pair_b])
+        order = np.lexsort((-np.tile(counts, 2), source))
+        self.partner = np.concatenate([self.pair_b, self.pair_a])[order]
+        self.partner_count = np.tile(counts, 2)[order]
+        self.indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=len(self.names)), out=self.indptr[1:])
+
+    @classmethod
+    def from_baskets(cls, baskets: list[list[str]]) -> "CoPurchaseIndex":
+        return cls(*basket_matrix(pd.Series(baskets, dtype=object)))
+
+    def _measures(self, x, y, count: np.ndarray) -> dict[str, np.ndarray]:
+        n = max(self.baskets, 1)
+        return {
+            "count": count,
+            "support": count / n,
+            "confidence": count / self.item_counts[x],
+            "lift": count * n / (self.item_counts[x] * self.item_counts[y]),
+        }
+
+    @staticmethod
+    def _top(measures: dict, sort_by: str, k: int, min_count: int) -> np.ndarray:
+        keep = np.flatnonzero(measures["count"] >= min_count)
+        # Ties on the chosen measure go to the more frequent pair.
+        order = np.lexsort((-measures["count"][keep], -measures[sort_by][keep]))
+        return keep[order[:k]]
+
+    def bought_with(
+        self, product: str, k: int = 10, sort_by: str = "lift", min_count: int = 2
+    ) -> list[dict]:
+        """Top-k products bought together with `product`."""
+        x = self.index[product]
+        lo, hi = self.indptr[x], self.indptr[x + 1]
+        partners = self.partner[lo:hi]
+        measures = self._measures(x, partners, self.partner_count[lo:hi])
+        return [
+            {"product": self.names[partners[i]], **_row(measures, i)}
+            for i in self._top(measures, sort_by, k, min_count)
+        ]
+
+    def top_pairs(
+        self, k: int = 10, sort_by: str = "lift", min_count: int = 2
+    ) -> list[dict]:
+        """Top-k product pairs over all baskets."""
+        measures = self._measures(self.pair_a, self.pair_b, self.pair_count)
+        # Confidence is directional; for pairs report the stronger direction.
+        measures["confidence"] = self.pair_count / np.minimum(
+            self.item_counts[self.pair_a], self.item_counts[self.pair_b]
+        )
+        return [
+            {
+                "product_a": self.names[self.pair_a[i]],
+                "product_b": self.names[self.pair_b[i]],
+                **_row(measures, i),
+            }
+            for i in self._top(measures, sort_by, k, min_count)
+        ]
+
+    def suggestions(self, product: str) -> list[str]:
+        return difflib.get_close_matches(product, self.names, n=5, cutoff=0.5)
+
+
+def _row(measures: dict, i: int) -> dict:
+    return {
+        "count": int(measures["count"][i]),
+        "support": round(float(measures["support"][i]), 6),
+        "confidence": round(float(measures["confidence"][i]), 4),
+        "lift": round(float(measures["lift"][i]), 4),
+    }
+
+
+def _read_baskets(tx) -> list[list[str]]:
+    return [record["products"] for record in tx.run(_BASKETS_QUERY)]
+
+
+def load_baskets(database: str = NEO4J_DATABASE) -> list[list[str]]:
+    """Streams the product list of every non-empty basket from Neo4j."""
+    with session(database=database, default_access_mode=READ_ACCESS) as neo4j_session:
+        return neo4j_session.execute_read(
+            unit_of_work(timeout=CO_PURCHASE_BUILD_TIMEOUT)(_read_baskets)
+        )
+
+
+def _build_index(graph, database: str) -> CoPurchaseIndex:
+    if graph is not None:
+        built = CoPurchaseIndex(
+            graph.tx_indptr, graph.tx_products, graph.labels["product"]
+        )
+    else:
+        built = CoPurchaseIndex.from_baskets(load_baskets(database))
+    logger.info(
+        f"Built co-purchase index: {built.baskets} baskets, "
+        f"{len(built.pair_count)} product pairs"
+    )
+    return built
+
+
+_index_cache = DerivedCache(_build_index)
+
+
+def get_co_purchase_index(database: str = NEO4J_DATABASE) -> CoPurchaseIndex:
+    """Returns the index for the current data, building it on first use.
+
+    Built from the in-process graph when LOCAL_GRAPH_PATH is loaded, else
+    from Neo4j; cached until the graph is reloaded or the data version moves.
+    """
+    return _index_cache.get(database)
+
+
+def co_purchase_payload(
+    product: str | None, top_k: int, sort_by: str, min_count: int
+) -> str:
+    """Runs a co-purchase lookup and renders it like run_cypher_query."""
+    if sort_by not in SORT_KEYS:
+        return error_payload(
+            "invalid_argument", f"sort_by must be one of {list(SORT_KEYS)}."
+        )
+    top_k = max(1, min(int(top_k), CO_PURCHASE_MAX_K))
+    index = get_co_purchase_index()
+    if product is None:
+        rows = index.top_pairs(top_k, sort_by, min_count)
+        columns = ["product_a", "product_b"]
+    elif product in index.index:
+        rows = index.bought_with(product, top_k, sort_by, min_count)
+        columns = ["product"]
+    else:
+        return error_payload(
+            "unknown_product",
+            f"No product named {product!r}.",
+            suggestions=index.suggestions(product),
+        )
+    collector = ResultCollector()
+    collector.columns = [*columns, "count", "support", "confidence", "lift"]
+    for row in rows:
+        collector.add(row)
+    return collector.render()
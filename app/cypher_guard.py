@@ -0,0 +1,135 @@
+import os
+import re
+from typing import Any
+
+from app.query_control import error_payload
+from app.query_results import QUERY_MAX_ROWS
+from app.result_cache import mask_literals, strip_comments
+
+# "off" skips the pre-flight, "hint" only reports findings, "limit" also
+# appends a LIMIT to unbounded results, "reject" refuses risky plans outright.
+CYPHER_GUARD_MODE = os.getenv("CYPHER_GUARD_MODE", "hint")
+# Plans where any operator expects more rows than this are considered risky.
+CYPHER_GUARD_MAX_ESTIMATED_ROWS = float(
+    os.getenv("CYPHER_GUARD_MAX_ESTIMATED_ROWS", "5000000")
+)
+
+_OPERATOR_HINTS = {
+    "CartesianProduct": "disconnected MATCH patterns produce a cartesian product; "
+    "connect them with a relationship or split the query",
+    "AllNodesScan": "a pattern without a label scans every node; "
+    "add a label such as (t:Transaction)",
+    "Eager": "the plan materialises intermediate rows (Eager); "
+    "aggregate or filter earlier",
+}
+_RISKY_OPERATORS = frozenset({"CartesianProduct", "AllNodesScan"})
+_LIMIT = re.compile(r"(?<![.\w$])limit\b", re.IGNORECASE)
+# Anything that can follow a LIMIT expression without ending the statement.
+_AFTER_LIMIT = re.compile(
+    r"\b(return|with|match|optional|unwind|call|yield|where|order|skip|union)\b|[{}]",
+    re.IGNORECASE,
+)
+_UNION = re.compile(r"\bunion\b", re.IGNORECASE)
+_SKIP_GUARD = re.compile(r"^\s*(explain|profile|show|call)\b", re.IGNORECASE)
+
+
+class PlanReview:
+    """Outcome of inspecting an EXPLAIN plan for a query."""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.operators: set[str] = set()
+        self.max_estimated_rows = 0.0
+        self.result_estimated_rows = 0.0
+        self.hints: list[str] = []
+        self.rejected = False
+
+
+def _operator_name(plan: dict[str, Any]) -> str:
+    # Neo4j 5 reports operators as e.g. "AllNodesScan@neo4j".
+    return plan.get("operatorType", "").split("@")[0]
+
+
+def _walk(plan: dict[str, Any]):
+    yield plan
+    for child in plan.get("children", []):
+        yield from _walk(child)
+
+
+def _has_final_limit(statement: str) -> bool:
+    # LIMIT takes any expression (LIMIT 10, LIMIT $n, LIMIT toInteger($n)),
+    # so look for a last LIMIT that no later clause or subquery follows.
+    masked = mask_literals(statement)
+    limits = list(_LIMIT.finditer(masked))
+    return bool(limits) and not _AFTER_LIMIT.search(masked, limits[-1].end())
+
+
+def should_review(query: str) -> bool:
+    """Whether a query is a plain statement the guard can EXPLAIN and rewrite."""
+    return CYPHER_GUARD_MODE != "off" and not _SKIP_GUARD.match(query)
+
+
+def review_plan(
+    query: str,
+    plan: dict[str, Any],
+    mode: str = CYPHER_GUARD_MODE,
+    max_rows: int = QUERY_MAX_ROWS,
+    max_estimated_rows: float = CYPHER_GUARD_MAX_ESTIMATED_ROWS,
+) -> PlanReview:
+    """Inspects an EXPLAIN plan and decides whether to run, rewrite or reject.
+
+    Args:
+        query: The query that was explained.
+        plan: The `plan` dict of the EXPLAIN result summary.
+        mode: One of "hint", "limit" or "reject".
+        max_rows: Row budget used when auto-injecting a LIMIT.
+        max_estimated_rows: Estimated row count above which a plan is risky.
+
+    Returns:
+        A PlanReview whose `query` is the (possibly rewritten) query to run.
+    """
+    review = PlanReview(query)
+    review.result_estimated_rows = float(plan.get("args", {}).get("EstimatedRows", 0.0))
+    for operator in _walk(plan):
+        name = _operator_name(operator)
+        review.operators.add(name)
+        rows = float(operator.get("args", {}).get("EstimatedRows", 0.0))
+        review.max_estimated_rows = max(review.max_estimated_rows, rows)
+
+    for name in sorted(review.operators & _OPERATOR_HINTS.keys()):
+        review.hints.append(_OPERATOR_HINTS[name])
+    too_big = review.max_estimated_rows > max_estimated_rows
+    if too_big:
+        review.hints.append(
+            f"the planner estimates {review.max_estimated_rows:,.0f} rows at some "
+            "step; anchor the MATCH on specific nodes or aggregate earlier"
+        )
+
+    if mode == "reject" and (too_big or review.operators & _RISKY_OPERATORS):
+        review.rejected = True
+        return review
+
+    statement = strip_comments(query)
+    unbounded = review.result_estimated_rows > max_rows
+    # A trailing LIMIT would only bind the last branch of a UNION.
+    can_limit = not _has_final_limit(statement) and not _UNION.search(
+        mask_literals(statement)
+    )
+    if mode in ("limit", "reject") and unbounded and can_limit:
+        review.query = f"{statement}\nLIMIT {max_rows}"
+        review.hints.append(
+            f"an estimated {review.result_estimated_rows:,.0f} rows would be "
+            f"returned, so LIMIT {max_rows} was added; aggregate for full coverage"
+        )
+    return review
+
+
+def rejection_error(review: PlanReview) -> str:
+    """Structured error returned instead of running a rejected query."""
+    return error_payload(
+        "rejected",
+        "Query was not executed because its plan looks too expensive.",
+        operators=sorted(review.operators & _OPERATOR_HINTS.keys()),
+        estimated_rows=review.max_estimated_rows,
+        hints=review.hints,
+    )
@@ -0,0 +1,68 @@
+import logging
+import os
+import threading
+import time
+
+from neo4j import READ_ACCESS
+
+from app.neo4j_driver import NEO4J_DATABASE, async_session, session
+
+logger = logging.getLogger(__name__)
+
+# Ingestion bumps this counter on a bookkeeping node; caches fold it into
+# their keys so results computed before a reload are never served after it.
+DATA_VERSION_QUERY = "MATCH (m:_Meta {key: 'data_version'}) RETURN m.version AS version"
+# How long a read of the stamp is trusted before asking the database again.
+DATA_VERSION_CHECK_INTERVAL = float(os.getenv("DATA_VERSION_CHECK_INTERVAL", "30"))
+
+_lock = threading.Lock()
+_versions: dict[str, tuple[int, float]] = {}
+
+
+def _cached_version(database: str) -> int | None:
+    cached = _versions.get(database)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    return None
+
+
+def _remember(database: str, record) -> int:
+    version = (record["version"] if record else None) or 0
+    _versions[database] = (version, time.monotonic() + DATA_VERSION_CHECK_INTERVAL)
+    return version
+
+
+def current_data_version(database: str = NEO4J_DATABASE) -> int:
+    """Returns the ingestion stamp of `database` (0 if never stamped)."""
+    version = _cached_version(database)
+    if version is not None:
+        return version
+    with _lock:
+        version = _cached_version(database)
+        if version is not None:
+            return version
+        with session(
+            database=database, default_access_mode=READ_ACCESS
+        ) as neo4j_session:
+            record = neo4j_session.run(DATA_VERSION_QUERY).single()
+        return _remember(database, record)
+
+
+async def current_data_version_async(database: str = NEO4J_DATABASE) -> int:
+    """Async variant of current_data_version."""
+    version = _cached_version(database)
+    if version is not None:
+        return version
+    async with async_session(
+        database=database, default_access_mode=READ_ACCESS
+    ) as neo4j_session:
+        record = await (await neo4j_session.run(DATA_VERSION_QUERY)).single()
+    return _remember(database, record)
+
+
+def forget_data_version(database: str | None = None) -> None:
+    """Makes the next lookup re-read the stamp from the database."""
+    if database is None:
+        _versions.clear()
+    else:
+        _versions.pop(database, None)
@@ -0,0 +1,500 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from collections.abc import Awaitable, Callable
+
+from neo4j import READ_ACCESS
+
+from app.data_version import current_data_version, current_data_version_async
+from app.neo4j_driver import NEO4J_DATABASE, async_session, session
+
+logger = logging.getLogger(__name__)
+
+# How long a rendered schema is served before it is re-read from the database.
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "600"))
+
+# "procedures" reads db.schema.* (exact, scans the store); "sample" inspects at
+# most SCHEMA_SAMPLE_SIZE nodes/relationships per label/type.
+SCHEMA_INTROSPECTION = os.getenv("SCHEMA_INTROSPECTION", "procedures")
+SCHEMA_SAMPLE_SIZE = int(os.getenv("SCHEMA_SAMPLE_SIZE", "1000"))
+
+# Precomputed aggregates built by `neo4j_ingest.py --aggregates`, keyed by
+# label, relationship type or "Label.property". Described in the schema text
+# when they were built from the current data, so the agent reads them instead
+# of scanning Transactions; after a load without --aggregates they are stale
+# and left out of the schema altogether.
+AGGREGATE_NOTES = {
+    "SalesSummary": "one node per city, season, store_type and payment_method "
+    "with transactions, revenue, items and avg_basket_size; sum over it for "
+    "totals by any of those dimensions",
+    "Product.purchase_count": "number of transactions containing the product",
+    "BOUGHT_WITH": "(:Product)-[:BOUGHT_WITH {count}]->(:Product) is stored once "
+    "per pair (a.name < b.name); count is the number of transactions with both, "
+    "so match it undirected",
+}
+
+
+class SchemaCache:
+    """TTL cache of rendered schema text, keyed by database name and data
+    version, so a reload is picked up without waiting for the TTL.
+
+    Refreshes are single-flight: concurrent callers for the same database wait
+    for the one in-progress load instead of each querying Neo4j.
+    """
+
+    def __init__(self, ttl: float = SCHEMA_CACHE_TTL):
+        self.ttl = ttl
+        # database -> (data version, text, expiry); older versions are replaced.
+        self._entries: dict[str, tuple[int, str, float]] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        # asyncio locks are bound to one event loop, like the async drivers.
+        self._async_locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, asyncio.Lock]
+        ] = weakref.WeakKeyDictionary()
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, database: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(database, threading.Lock())
+
+    def _fresh(self, database: str, data_version: int) -> str | None:
+        entry = self._entries.get(database)
+        if (
+            entry is not None
+            and entry[0] == data_version
+            and entry[2] > time.monotonic()
+        ):
+            return entry[1]
+        return None
+
+    def _store(self, database: str, data_version: int, text: str) -> None:
+        self._entries[database] = (data_version, text, time.monotonic() + self.ttl)
+
+    def get(
+        self, database: str, loader: Callable[[str], str], data_version: int = 0
+    ) -> str:
+        """Returns the cached schema for `database` at `data_version`, loading
+        it if stale."""
+        text = self._fresh(database, data_version)
+        if text is not None:
+            return text
+        with self._lock_for(database):
+            # Another caller may have refreshed while we waited for the lock.
+            text = self._fresh(database, data_version)
+            if text is None:
+                text = loader(database)
+                self._store(database, data_version, text)
+        return text
+
+    async def get_async(
+        self,
+        database: str,
+        loader: Callable[[str], Awaitable[str]],
+        data_version: int = 0,
+    ) -> str:
+        """Async variant of `get` for loaders running on the event loop."""
+        text = self._fresh(database, data_version)
+        if text is not None:
+            return text
+        loop = asyncio.get_running_loop()
+        with self._locks_guard:
+            locks = self._async_locks.setdefault(loop, {})
+            lock = locks.setdefault(database, asyncio.Lock())
+        async with lock:
+            text = self._fresh(database, data_version)
+            if text is None:
+                text = await loader(database)
+                self._store(database, data_version, text)
+        return text
+
+    def invalidate(self, database: str | None = None) -> None:
+        """Drops the entry for `database`, or every entry when None."""
+        if database is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(database, None)
+
+
+_schema_cache = SchemaCache()
+
+
+_SCHEMA_QUERY = """
+CALL {
+    CALL db.schema.nodeTypeProperties()
+    YIELD nodeLabels, propertyName, propertyTypes, mandatory
+    RETURN collect({labels: nodeLabels, property: propertyName,
+                    types: propertyTypes, mandatory: mandatory}) AS nodeProps
+}
+CALL {
+    CALL db.schema.relTypeProperties()
+    YIELD relType, propertyName, propertyTypes, mandatory
+    RETURN collect({type: relType, property: propertyName,
+                    types: propertyTypes, mandatory: mandatory}) AS relProps
+}
+CALL {
+    CALL db.schema.visualization() YIELD nodes, relationships
+    RETURN nodes, relationships
+}
+RETURN nodeProps, relProps, nodes, relationships
+"""
+
+_TOKENS_QUERY = """
+CALL db.labels() YIELD label
+WITH collect(label) AS labels
+CALL db.relationshipTypes() YIELD relationshipType
+RETURN labels, collect(relationshipType) AS types
+"""
+
+# Online indexes; the leading property of each is what a predicate can use.
+_INDEXES_QUERY = """
+SHOW INDEXES YIELD labelsOrTypes, properties, type, state
+WHERE state = 'ONLINE' AND type <> 'LOOKUP'
+RETURN labelsOrTypes, properties
+"""
+
+# Whether the aggregates were stamped with the current data version.
+_AGGREGATES_QUERY = """
+OPTIONAL MATCH (v:_Meta {key: 'data_version'})
+OPTIONAL MATCH (a:_Meta {key: 'aggregates'})
+RETURN coalesce(a.data_version = v.version, false) AS current
+"""
+
+# Python value types returned by the driver, named like db.schema.* does.
+_VALUE_TYPES = {
+    "str": "String",
+    "int": "Long",
+    "float": "Double",
+    "bool": "Boolean",
+    "list": "List",
+    "Date": "Date",
+    "DateTime": "DateTime",
+    "Time": "Time",
+    "Duration": "Duration",
+}
+
+
+def _quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _empty_schema() -> dict:
+    return {
+        "nodes": {},
+        "relationships": {},
+        "endpoints": set(),
+        "indexed": set(),
+        "aggregates_current": False,
+    }
+
+
+def _add_property(
+    properties: dict, owner: str, name: str | None, types: list, mandatory: bool
+) -> None:
+    props = properties.setdefault(owner, {})
+    if name is not None:
+        props[name] = {"types": sorted(types), "mandatory": mandatory}
+
+
+def _schema_from_procedures(record) -> dict:
+    schema = _empty_schema()
+    for row in record["nodeProps"]:
+        for label in row["labels"]:
+            _add_property(
+                schema["nodes"],
+                label,
+                row["property"],
+                row["types"] or [],
+                row["mandatory"],
+            )
+    for row in record["relProps"]:
+        # relType is reported as ":`TYPE`"
+        rel_type = row["type"].lstrip(":").strip("`")
+        _add_property(
+            schema["relationships"],
+            rel_type,
+            row["property"],
+            row["types"] or [],
+            row["mandatory"],
+        )
+
+    # Endpoints come from the virtual graph of db.schema.visualization().
+    names = {node.element_id: node["name"] for node in record["nodes"]}
+    for rel in record["relationships"]:
+        schema["endpoints"].add(
+            (
+                names.get(rel.start_node.element_id, "?"),
+                rel.type,
+                names.get(rel.end_node.element_id, "?"),
+            )
+        )
+    return schema
+
+
+def _sampling_query(
+    labels: list[str], rel_types: list[str], sample_size: int
+) -> tuple[str, dict]:
+    """Builds one UNION ALL query covering every label and relationship type."""
+    parts = []
+    params: dict = {"sample": sample_size}
+    for i, label in enumerate(labels):
+        params[f"label_{i}"] = label
+        parts.append(
+            f"MATCH (n:{_quote(label)}) WITH n LIMIT $sample "
+            "UNWIND keys(n) AS key "
+            f"RETURN 'node' AS kind, $label_{i} AS owner, "
+            "key AS detail, head(collect(n[key])) AS example"
+        )
+    for i, rel_type in enumerate(rel_types):
+        params[f"type_{i}"] = rel_type
+        parts.append(
+            f"MATCH ()-[r:{_quote(rel_type)}]->() WITH r LIMIT $sample "
+            "UNWIND keys(r) AS key "
+            f"RETURN 'rel' AS kind, $type_{i} AS owner, "
+            "key AS detail, head(collect(r[key])) AS example"
+        )
+        parts.append(
+            f"MATCH (a)-[r:{_quote(rel_type)}]->(b) WITH a, b LIMIT $sample "
+            f"RETURN DISTINCT 'endpoint' AS kind, $type_{i} AS owner, "
+            "head(labels(a)) AS detail, head(labels(b)) AS example"
+        )
+    return "\nUNION ALL\n".join(parts), params
+
+
+def _schema_from_samples(labels: list[str], rel_types: list[str], rows) -> dict:
+    schema = _empty_schema()
+    for label in labels:
+        schema["nodes"].setdefault(label, {})
+    for rel_type in rel_types:
+        schema["relationships"].setdefault(rel_type, {})
+    for row in rows:
+        if row["kind"] == "endpoint":
+            schema["endpoints"].add((row["detail"], row["owner"], row["example"]))
+            continue
+        value_type = _VALUE_TYPES.get(type(row["example"]).__name__, "Any")
+        target = schema["nodes"] if row["kind"] == "node" else schema["relationships"]
+        # Presence is unknown when sampling, so nothing is flagged optional.
+        _add_property(target, row["owner"], row["detail"], [value_type], True)
+    return schema
+
+
+def _indexed_properties(rows) -> set[tuple[str, str]]:
+    return {
+        (owner, row["properties"][0])
+        for row in rows
+        if row["properties"]
+        for owner in row["labelsOrTypes"] or []
+    }
+
+
+def _read_indexes(neo4j_session) -> set[tuple[str, str]]:
+    try:
+        return _indexed_properties(neo4j_session.run(_INDEXES_QUERY))
+    except Exception as e:
+        logger.warning(f"SHOW INDEXES failed ({e}); indexes are not reported")
+        return set()
+
+
+async def _read_indexes_async(neo4j_session) -> set[tuple[str, str]]:
+    try:
+        result = await neo4j_session.run(_INDEXES_QUERY)
+        return _indexed_properties([row async for row in result])
+    except Exception as e:
+        logger.warning(f"SHOW INDEXES failed ({e}); indexes are not reported")
+        return set()
+
+
+def _read_aggregates_current(neo4j_session) -> bool:
+    return neo4j_session.run(_AGGREGATES_QUERY).single()["current"]
+
+
+async def _read_aggregates_current_async(neo4j_session) -> bool:
+    return (await (await neo4j_session.run(_AGGREGATES_QUERY)).single())["current"]
+
+
+def _introspect_with_procedures(neo4j_session) -> dict:
+    return _schema_from_procedures(neo4j_session.run(_SCHEMA_QUERY).single())
+
+
+def _introspect_with_sampling(neo4j_session, sample_size: int) -> dict:
+    record = neo4j_session.run(_TOKENS_QUERY).single()
+    labels, rel_types = record["labels"], record["types"]
+    rows = []
+    if labels or rel_types:
+        query, params = _sampling_query(labels, rel_types, sample_size)
+        rows = list(neo4j_session.run(query, params))
+    return _schema_from_samples(labels, rel_types, rows)
+
+
+async def _introspect_with_procedures_async(neo4j_session) -> dict:
+    result = await neo4j_session.run(_SCHEMA_QUERY)
+    return _schema_from_procedures(await result.single())
+
+
+async def _introspect_with_sampling_async(neo4j_session, sample_size: int) -> dict:
+    record = await (await neo4j_session.run(_TOKENS_QUERY)).single()
+    labels, rel_types = record["labels"], record["types"]
+    rows = []
+    if labels or rel_types:
+        query, params = _sampling_query(labels, rel_types, sample_size)
+        rows = [row async for row in await neo4j_session.run(query, params)]
+    return _schema_from_samples(labels, rel_types, rows)
+
+
+def render_schema(schema: dict) -> str:
+    """Renders introspected schema as compact text for the agent."""
+
+    if not schema.get("aggregates_current", False):
+        schema = _without_aggregates(schema)
+    indexed = schema.get("indexed", set())
+
+    def props_text(owner: str, props: dict) -> str:
+        parts = []
+        for name, info in sorted(props.items()):
+            types = "|".join(info["types"]) or "Any"
+            optional = "" if info["mandatory"] else ", optional"
+            index = ", indexed" if (owner, name) in indexed else ""
+            parts.append(f"{name} ({types}{optional}{index})")
+        return ", ".join(parts)
+
+    # Labels starting with "_" are internal bookkeeping (e.g. _Meta).
+    labels = sorted(label for label in schema["nodes"] if not label.startswith("_"))
+    rel_types = sorted(schema["relationships"])
+    schema_info = [
+        f"Node Labels: {', '.join(labels)}",
+        f"Relationship Types: {', '.join(rel_types)}",
+    ]
+    if schema["endpoints"]:
+        schema_info.append("Relationships:")
+        for start, rel_type, end in sorted(schema["endpoints"]):
+            schema_info.append(f"  (:{start})-[:{rel_type}]->(:{end})")
+    for label in labels:
+        if schema["nodes"][label]:
+            schema_info.append(
+                f"Properties for {label}: {props_text(label, schema['nodes'][label])}"
+            )
+    for rel_type in rel_types:
+        if schema["relationships"][rel_type]:
+            schema_info.append(
+                f"Properties for [:{rel_type}]: "
+                f"{props_text(rel_type, schema['relationships'][rel_type])}"
+            )
+    notes = [
+        f"  {key}: {note}"
+        for key, note in AGGREGATE_NOTES.items()
+        if _has_schema_item(schema, key)
+    ]
+    if notes:
+        schema_info.append(
+            "Precomputed aggregates (prefer over scanning Transactions):"
+        )
+        schema_info.extend(notes)
+    return "\n".join(schema_info)
+
+
+def _without_aggregates(schema: dict) -> dict:
+    """A copy of `schema` without the AGGREGATE_NOTES items."""
+    nodes = {label: dict(props) for label, props in schema["nodes"].items()}
+    relationships = dict(schema["relationships"])
+    for key in AGGREGATE_NOTES:
+        label, _, prop = key.partition(".")
+        if prop:
+            nodes.get(label, {}).pop(prop, None)
+        else:
+            nodes.pop(key, None)
+            relationships.pop(key, None)
+    endpoints = {
+        endpoint
+        for endpoint in schema["endpoints"]
+        if not set(endpoint) & AGGREGATE_NOTES.keys()
+    }
+    return {
+        **schema,
+        "nodes": nodes,
+        "relationships": relationships,
+        "endpoints": endpoints,
+    }
+
+
+def _has_schema_item(schema: dict, key: str) -> bool:
+    label, _, prop = key.partition(".")
+    if prop:
+        return prop in schema["nodes"].get(label, {})
+    return key in schema["nodes"] or key in schema["relationships"]
+
+
+def introspect_schema(database: str = NEO4J_DATABASE) -> dict:
+    """Collects labels, relationship types, endpoints and typed properties."""
+    with session(database=database, default_access_mode=READ_ACCESS) as neo4j_session:
+        if SCHEMA_INTROSPECTION == "sample":
+            schema = _introspect_with_sampling(neo4j_session, SCHEMA_SAMPLE_SIZE)
+        else:
+            try:
+                schema = _introspect_with_procedures(neo4j_session)
+            except Exception as e:
+                logger.warning(
+                    f"db.schema procedures failed ({e}); falling back to sampling"
+                )
+                schema = _introspect_with_sampling(neo4j_session, SCHEMA_SAMPLE_SIZE)
+        schema["indexed"] = _read_indexes(neo4j_session)
+        schema["aggregates_current"] = _read_aggregates_current(neo4j_session)
+        return schema
+
+
+async def introspect_schema_async(database: str = NEO4J_DATABASE) -> dict:
+    """Async variant of introspect_schema on the shared async driver."""
+    async with async_session(
+        database=database, default_access_mode=READ_ACCESS
+    ) as neo4j_session:
+        if SCHEMA_INTROSPECTION == "sample":
+            schema = await _introspect_with_sampling_async(
+                neo4j_session, SCHEMA_SAMPLE_SIZE
+            )
+        else:
+            try:
+                schema = await _introspect_with_procedures_async(neo4j_session)
+            except Exception as e:
+                logger.warning(
+                    f"db.schema procedures failed ({e}); falling back to sampling"
+                )
+                schema = await _introspect_with_sampling_async(
+                    neo4j_session, SCHEMA_SAMPLE_SIZE
+                )
+        schema["indexed"] = await _read_indexes_async(neo4j_session)
+        schema["aggregates_current"] = await _read_aggregates_current_async(
+            neo4j_session
+        )
+        return schema
+
+
+def load_schema(database: str = NEO4J_DATABASE) -> str:
+    """Reads the schema from Neo4j and renders it for the agent."""
+    text = render_schema(introspect_schema(database))
+    logger.info(f"Loaded graph schema for database {database}")
+    return text
+
+
+async def load_schema_async(database: str = NEO4J_DATABASE) -> str:
+    """Async variant of load_schema."""
+    text = render_schema(await introspect_schema_async(database))
+    logger.info(f"Loaded graph schema for database {database}")
+    return text
+
+
+def get_schema_text(database: str = NEO4J_DATABASE) -> str:
+    """Returns the rendered schema, served from cache when fresh."""
+    version = current_data_version(database)
+    return _schema_cache.get(database, load_schema, version)
+
+
+async def get_schema_text_async(database: str = NEO4J_DATABASE) -> str:
+    """Async variant of get_schema_text."""
+    version = await current_data_version_async(database)
+    return await _schema_cache.get_async(database, load_schema_async, version)
+
+
+def invalidate_schema_cache(database: str | None = None) -> None:
+    """Forces the next get_graph_schema call to re-read the database."""
+    _schema_cache.invalidate(database)
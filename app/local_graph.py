@@ -0,0 +1,482 @@
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable, Iterable
+from typing import Generic, TypeVar
+
+import numpy as np
+import pandas as pd
+
+from app.data_version import current_data_version
+from app.neo4j_ingest import DATE_FORMAT, parse_product_lists, read_chunks
+from app.query_results import ResultCollector
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# CSV/Parquet/Arrow file (as read by neo4j_ingest.py) to load into memory for
+# run_graph_aggregate; unset, every aggregate is answered by Neo4j.
+LOCAL_GRAPH_PATH = os.getenv("LOCAL_GRAPH_PATH", "")
+# Most groups an aggregate may return.
+AGGREGATE_MAX_LIMIT = int(os.getenv("AGGREGATE_MAX_LIMIT", "200"))
+
+# Dimensions an aggregate can group or filter by -> Cypher expression.
+DIMENSIONS = {
+    "city": "cy.name",
+    "store_type": "s.type",
+    "customer": "c.name",
+    "customer_category": "c.category",
+    "product": "p.name",
+    "season": "t.season",
+    "payment_method": "t.payment_method",
+    "year": "t.year",
+    "month": "t.month",
+    "week": "t.week",
+}
+METRICS = {
+    "revenue": "sum(t.total_cost)",
+    "transactions": "count(t)",
+    "items": "sum(t.total_items)",
+    "avg_basket": "avg(t.total_cost)",
+    "customers": "count(DISTINCT c)",
+}
+_INT_DIMENSIONS = frozenset({"year", "month", "week"})
+# Pattern binding each Cypher variable. Dimensions behind a relationship drop
+# transactions without one, as MATCH does; the local engine mirrors that.
+_MATCHES = {
+    "c": "MATCH (c:Customer)-[:MADE]->(t)",
+    "cy": "MATCH (t)-[:IN_CITY]->(cy:City)",
+    "s": "MATCH (t)-[:AT]->(s:Store)",
+    "p": "MATCH (t)-[:CONTAINS]->(p:Product)",
+}
+# Raw input column of each transaction-level text dimension.
+_COLUMNS = {
+    "city": "City",
+    "store_type": "Store_Type",
+    "customer": "Customer_Name",
+    "season": "Season",
+    "payment_method": "Payment_Method",
+}
+
+
+class AggregateQuery:
+    """A validated aggregate: one metric, optionally grouped and filtered.
+
+    `filters` maps a dimension to the values it may take (OR within a
+    dimension, AND across dimensions); `start_date`/`end_date` bound t.date
+    inclusively.
+    """
+
+    def __init__(
+        self,
+        metric: str,
+        group_by: list[str],
+        filters: dict[str, list],
+        start_date: str | None,
+        end_date: str | None,
+        limit: int,
+    ):
+        self.metric = metric
+        self.group_by = group_by
+        self.filters = filters
+        self.start_date = start_date
+        self.end_date = end_date
+        self.limit = limit
+
+    def variables(self) -> set[str]:
+        """Cypher variables (besides t) the query needs bound."""
+        used = set(self.group_by) | set(self.filters)
+        if "product" not in self.group_by:
+            # Filtered through an existence check instead of a MATCH.
+            used.discard("product")
+        names = {DIMENSIONS[dim].partition(".")[0] for dim in used}
+        if self.metric == "customers":
+            names.add("c")
+        return names - {"t"}
+
+
+def parse_aggregate(
+    metric: str,
+    group_by: list[str] | None = None,
+    filters: list[str] | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    limit: int = 20,
+) -> AggregateQuery:
+    """Validates tool arguments; `filters` entries look like "city=Chicago".
+
+    Raises:
+        ValueError: With a message the agent can act on.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; use one of {list(METRICS)}.")
+    group_by = list(group_by or [])
+    for dim in group_by:
+        if dim not in DIMENSIONS:
+            raise ValueError(
+                f"Unknown dimension {dim!r}; use one of {list(DIMENSIONS)}."
+            )
+    if len(set(group_by)) != len(group_by):
+        raise ValueError("group_by must not repeat a dimension.")
+    parsed: dict[str, list] = {}
+    for entry in filters or []:
+        dim, sep, value = entry.partition("=")
+        dim, value = dim.strip(), value.strip()
+        if not sep or dim not in DIMENSIONS:
+            raise ValueError(
+                f"Bad filter {entry!r}; write dimension=value with a dimension "
+                f"from {list(DIMENSIONS)}."
+            )
+        if dim in _INT_DIMENSIONS:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"Filter {entry!r} needs a whole number.") from None
+        parsed.setdefault(dim, []).append(value)
+    for bound in (start_date, end_date):
+        if bound is not None:
+            try:
+                np.datetime64(bound, "D")
+            except ValueError:
+                raise ValueError(f"Dates must be YYYY-MM-DD, got {bound!r}.") from None
+    limit = max(1, min(int(limit), AGGREGATE_MAX_LIMIT))
+    return AggregateQuery(metric, group_by, parsed, start_date, end_date, limit)
+
+
+def _literal(value) -> str:
+    # JSON string escapes are valid Cypher string escapes.
+    return str(value) if isinstance(value, int) else json.dumps(value)
+
+
+def aggregate_cypher(query: AggregateQuery) -> str:
+    """The Cypher equivalent of `query`, for when no local graph is loaded."""
+    lines = ["MATCH (t:Transaction)"]
+    lines += [_MATCHES[name] for name in _MATCHES if name in query.variables()]
+    conditions = []
+    for dim, values in query.filters.items():
+        listed = ", ".join(_literal(value) for value in values)
+        if dim == "product" and "product" not in query.group_by:
+            conditions.append(
+                "EXISTS { MATCH (t)-[:CONTAINS]->(p:Product) "
+                f"WHERE p.name IN [{listed}] }}"
+            )
+        else:
+            conditions.append(f"{DIMENSIONS[dim]} IN [{listed}]")
+    if query.start_date:
+        conditions.append(f"t.date >= date({_literal(query.start_date)})")
+    if query.end_date:
+        conditions.append(f"t.date <= date({_literal(query.end_date)})")
+    if conditions:
+        lines.append("WHERE " + "\n  AND ".join(conditions))
+    returns = [f"{DIMENSIONS[dim]} AS {dim}" for dim in query.group_by]
+    returns.append(f"{METRICS[query.metric]} AS {query.metric}")
+    lines.append("RETURN " + ", ".join(returns))
+    if query.group_by:
+        lines.append(f"ORDER BY {query.metric} DESC")
+        lines.append(f"LIMIT {query.limit}")
+    return "\n".join(lines)
+
+
+def _factorize(values, keep_null: bool) -> tuple[np.ndarray, list]:
+    """Integer codes and labels; nulls get their own None label if kept, else -1."""
+    codes, uniques = pd.factorize(values)
+    labels = [value.item() if hasattr(value, "item") else value for value in uniques]
+    if keep_null and (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels.append(None)
+    return codes.astype(np.int64), labels
+
+
+def _distinct(keys: np.ndarray) -> np.ndarray:
+    # Sort-based; much faster than np.unique's hash path for large int keys.
+    keys = np.sort(keys)
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+
+
+def _csr(owners: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """CSR index of the rows in `owners` (-1 = none): (indptr, row indices)."""
+    valid = np.flatnonzero(owners >= 0)
+    order = valid[np.argsort(owners[valid], kind="stable")]
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners[valid], minlength=size), out=indptr[1:])
+    return indptr, order
+
+
+def _expand(indptr: np.ndarray, owners: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Positions of all CSR entries of `owners`, with the owner of each."""
+    counts = indptr[owners + 1] - indptr[owners]
+    ends = np.cumsum(counts)
+    positions = np.arange(ends[-1] if len(ends) else 0, dtype=np.int64)
+    positions += np.repeat(indptr[owners] - (ends - counts), counts)
+    return np.repeat(owners, counts), positions
+
+
+def basket_matrix(baskets: pd.Series) -> tuple[np.ndarray, np.ndarray, list]:
+    """Transaction x product incidence in CSR form from lists of product names.
+
+    Returns (indptr, product codes, product names). A product counts once per
+    basket, as CONTAINS is merged, and codes within a basket are sorted.
+    """
+    lengths = baskets.map(len).to_numpy()
+    flat = pd.Series([name for items in baskets for name in items], dtype=object)
+    codes, names = _factorize(flat, keep_null=False)
+    width = max(len(names), 1)
+    pairs = _distinct(
+        np.repeat(np.arange(len(baskets), dtype=np.int64), lengths) * width + codes
+    )
+    indptr, _ = _csr(pairs // width, len(baskets))
+    return indptr, pairs % width, names
+
+
+class LocalGraph:
+    """Array-backed copy of the retail graph for in-process aggregates.
+
+    Transactions are parallel NumPy arrays, and text dimensions are integer
+    codes into `labels[dimension]`. Customer->Transaction, Transaction->
+    Product and Product->Transaction adjacency is kept in CSR form (indptr
+    plus indices), so paths from a few customers or products touch only
+    their own rows.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.drop_duplicates("Transaction_ID", keep="last")
+        frame = frame.reset_index(drop=True)
+        self.size = len(frame)
+        self.codes: dict[str, np.ndarray] = {}
+        self.labels: dict[str, list] = {}
+        for dim, column in _COLUMNS.items():
+            keep_null = DIMENSIONS[dim].startswith("t.")
+            self.codes[dim], self.labels[dim] = _factorize(frame[column], keep_null)
+
+        # Neo4j keeps the category a customer was created with.
+        customer = self.codes["customer"]
+        first = frame.loc[customer >= 0].drop_duplicates("Customer_Name")
+        codes, self.labels["customer_category"] = _factorize(
+            first["Customer_Category"], keep_null=True
+        )
+        self.customer_category = np.full(len(self.labels["customer"]), -1)
+        self.customer_category[customer[first.index.to_numpy()]] = codes
+
+        dates = pd.to_datetime(frame["Date"], format=DATE_FORMAT, errors="coerce")
+        self.dates = dates.to_numpy().astype("datetime64[D]")
+        parts = {
+            "year": dates.dt.year,
+            "month": dates.dt.month,
+            "week": dates.dt.isocalendar().week,
+        }
+        for dim, part in parts.items():
+            self.codes[dim], self.labels[dim] = _factorize(
+                part.astype("Int64"), keep_null=True
+            )
+        self.total_cost = frame["Total_Cost"].to_numpy(dtype=np.float64)
+        self.total_items = frame["Total_Items"].to_numpy(dtype=np.int64)
+
+        self.tx_indptr, self.tx_products, self.labels["product"] = basket_matrix(
+            parse_product_lists(frame["Product"])
+        )
+        width = max(len(self.labels["product"]), 1)
+        self.product_indptr, order = _csr(self.tx_products, width)
+        self.product_txs = np.repeat(
+            np.arange(self.size, dtype=np.int64), np.diff(self.tx_indptr)
+        )[order]
+        self.customer_indptr, self.customer_txs = _csr(
+            customer, len(self.labels["customer"])
+        )
+
+    @classmethod
+    def load(cls, path: str, frames: Iterable[pd.DataFrame] | None = None):
+        """Reads `path` in chunks, the way neo4j_ingest.py does."""
+        frames = read_chunks(path) if frames is None else frames
+        return cls(pd.concat(list(frames), ignore_index=True))
+
+    def _wanted(self, dim: str, values: list) -> np.ndarray:
+        index = {label: code for code, label in enumerate(self.labels[dim])}
+        return np.array([index[v] for v in values if v in index], dtype=np.int64)
+
+    def _code_at(self, dim: str, txs: np.ndarray) -> np.ndarray:
+        if dim == "customer_category":
+            return self.customer_category[self.codes["customer"][txs]]
+        return self.codes[dim][txs]
+
+    def _transactions(self, query: AggregateQuery) -> np.ndarray:
+        """Indices of the transactions matching the query's filters."""
+        filters = query.filters
+        if "customer" in filters:
+            _, positions = _expand(
+                self.customer_indptr, self._wanted("customer", filters["customer"])
+            )
+            txs = np.sort(self.customer_txs[positions])
+        elif "product" in filters:
+            _, positions = _expand(
+                self.product_indptr, self._wanted("product", filters["product"])
+            )
+            txs = _distinct(self.product_txs[positions])
+        else:
+            txs = np.arange(self.size, dtype=np.int64)
+
+        keep = np.ones(len(txs), dtype=bool)
+        for dim, values in filters.items():
+            if dim == "product":
+                if "customer" in filters:
+                    _, positions = _expand(
+                        self.product_indptr, self._wanted(dim, values)
+                    )
+                    keep &= np.isin(txs, self.product_txs[positions])
+            elif dim != "customer":
+                keep &= np.isin(self._code_at(dim, txs), self._wanted(dim, values))
+        if query.start_date:
+            keep &= self.dates[txs] >= np.datetime64(query.start_date, "D")
+        if query.end_date:
+            keep &= self.dates[txs] <= np.datetime64(query.end_date, "D")
+        if "c" in query.variables():
+            keep &= self.codes["customer"][txs] >= 0
+        for dim in ("city", "store_type"):
+            if dim in query.group_by or dim in filters:
+                keep &= self.codes[dim][txs] >= 0
+        return txs[keep]
+
+    def aggregate(self, query: AggregateQuery) -> list[dict]:
+        """Evaluates `query` with the semantics of aggregate_cypher(query)."""
+        txs = self._transactions(query)
+        products = None
+        if "product" in query.group_by:
+            txs, positions = _expand(self.tx_indptr, txs)
+            products = self.tx_products[positions]
+            if "product" in query.filters:
+                keep = np.isin(
+                    products, self._wanted("product", query.filters["product"])
+                )
+                txs, products = txs[keep], products[keep]
+
+        if query.group_by:
+            codes = [
+                products if dim == "product" else self._code_at(dim, txs)
+                for dim in query.group_by
+            ]
+            sizes = tuple(len(self.labels[dim]) for dim in query.group_by)
+            keys = np.ravel_multi_index(codes, sizes) if len(txs) else txs
+            groups, inverse = np.unique(keys, return_inverse=True)
+        else:
+            sizes = ()
+            groups = np.zeros(1, dtype=np.int64)
+            inverse = np.zeros(len(txs), dtype=np.int64)
+
+        values = self._metric(query.metric, txs, inverse, len(groups))
+        order = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind="stable")
+        if query.group_by:
+            order = order[: query.limit]
+            columns = np.unravel_index(groups[order], sizes)
+        else:
+            columns = ()
+        rows = []
+        for i, group in enumerate(order):
+            row = {
+                dim: self.labels[dim][columns[d][i]]
+                for d, dim in enumerate(query.group_by)
+            }
+            value = values[group]
+            if np.isnan(value):
+                row[query.metric] = None
+            elif query.metric in ("transactions", "items", "customers"):
+                row[query.metric] = int(value)
+            else:
+                row[query.metric] = float(value)
+            rows.append(row)
+        return rows
+
+    def _metric(
+        self, metric: str, txs: np.ndarray, inverse: np.ndarray, groups: int
+    ) -> np.ndarray:
+        count = np.bincount(inverse, minlength=groups).astype(np.float64)
+        if metric == "transactions":
+            return count
+        if metric == "items":
+            return np.bincount(inverse, self.total_items[txs], minlength=groups)
+        if metric == "customers":
+            width = len(self.labels["customer"])
+            pairs = _distinct(inverse * width + self.codes["customer"][txs])
+            return np.bincount(pairs // width, minlength=groups).astype(np.float64)
+        revenue = np.bincount(inverse, self.total_cost[txs], minlength=groups)
+        if metric == "revenue":
+            return revenue
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, revenue / count, np.nan)
+
+
+_lock = threading.Lock()
+_loaded: tuple[str, float, LocalGraph] | None = None
+
+
+def _current_local_graph(path: str) -> tuple[str, float, LocalGraph] | None:
+    """The (path, mtime, graph) loaded for `path`, reloading it when the file
+    changes; None when no path is configured or loading fails."""
+    global _loaded
+    if not path:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError as e:
+        logger.warning(f"Local graph unavailable ({e}); using Neo4j")
+        return None
+    with _lock:
+        if _loaded is None or _loaded[:2] != (path, mtime):
+            try:
+                graph = LocalGraph.load(path)
+            except Exception as e:
+                logger.warning(f"Loading local graph failed ({e}); using Neo4j")
+                return None
+            _loaded = (path, mtime, graph)
+            logger.info(f"Loaded local graph from {path}: {graph.size} transactions")
+        return _loaded
+
+
+def get_local_graph(path: str = LOCAL_GRAPH_PATH) -> LocalGraph | None:
+    """Returns the in-memory graph for `path`, reloading it when the file
+    changes; None when no path is configured or loading fails."""
+    loaded = _current_local_graph(path)
+    return loaded[2] if loaded is not None else None
+
+
+class DerivedCache(Generic[T]):
+    """Holds one value derived from the current data: the local graph when
+    LOCAL_GRAPH_PATH is loaded, else Neo4j at its data version.
+
+    The entry is keyed on the graph's path and mtime, not on the graph
+    itself, so a reloaded graph does not keep the previous one alive.
+    """
+
+    def __init__(self, build: Callable[[LocalGraph | None, str], T]):
+        self._build = build
+        self._lock = threading.Lock()
+        self._cached: tuple[tuple, T] | None = None
+
+    def get(self, database: str, path: str = LOCAL_GRAPH_PATH) -> T:
+        """Returns the value for the current data, building it if it moved.
+
+        `build(graph, database)` gets the local graph, or None to read Neo4j.
+        """
+        loaded = _current_local_graph(path)
+        if loaded is not None:
+            graph, source = loaded[2], ("local", *loaded[:2])
+        else:
+            graph, source = None, ("neo4j", database, current_data_version(database))
+        with self._lock:
+            if self._cached is None or self._cached[0] != source:
+                self._cached = (source, self._build(graph, database))
+            return self._cached[1]
+
+
+def local_aggregate(query: AggregateQuery) -> str | None:
+    """Answers `query` in-process in run_cypher_query's JSON format, or
+    returns None when no local graph is available."""
+    graph = get_local_graph()
+    if graph is None:
+        return None
+    collector = ResultCollector()
+    collector.columns = [*query.group_by, query.metric]
+    for row in graph.aggregate(query):
+        if not collector.add(row):
+            break
+    return collector.render()
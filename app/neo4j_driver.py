@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+from neo4j import (
+    AsyncDriver,
+    AsyncGraphDatabase,
+    AsyncSession,
+    Driver,
+    GraphDatabase,
+    Session,
+)
+
+logger = logging.getLogger(__name__)
+
+# Neo4j connection details
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "mynewpassword")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "retail-graph")
+
+# Connection pool tuning (seconds for lifetimes/timeouts)
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(
+    os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600")
+)
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(
+    os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "30")
+)
+
+# Seconds to wait for an async driver to close on another thread's loop.
+_CLOSE_TIMEOUT = 5.0
+
+_lock = threading.Lock()
+_drivers: dict[str, Driver] = {}
+# Async drivers are bound to the event loop they were created on.
+_async_drivers: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, AsyncDriver]
+] = weakref.WeakKeyDictionary()
+_stats = {
+    "drivers_created": 0,
+    "sessions_opened": 0,
+    "sessions_in_use": 0,
+    "peak_sessions_in_use": 0,
+}
+
+
+def _pool_settings() -> dict[str, Any]:
+    return {
+        "auth": (NEO4J_USER, NEO4J_PASSWORD),
+        "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+        "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME,
+        "connection_acquisition_timeout": NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    }
+
+
+def get_driver(uri: str = NEO4J_URI) -> Driver:
+    """Returns the process-wide driver for `uri`, creating it on first use.
+
+    The driver owns a connection pool, so it is shared by every tool call
+    instead of reconnecting (TCP, Bolt handshake, auth) per query.
+    """
+    driver = _drivers.get(uri)
+    if driver is not None:
+        return driver
+    with _lock:
+        driver = _drivers.get(uri)
+        if driver is None:
+            logger.info(
+                f"Creating Neo4j driver for {uri} (pool size {NEO4J_MAX_POOL_SIZE})"
+            )
+            driver = GraphDatabase.driver(uri, **_pool_settings())
+            _drivers[uri] = driver
+            _stats["drivers_created"] += 1
+    return driver
+
+
+def _session_opened() -> None:
+    with _lock:
+        _stats["sessions_opened"] += 1
+        _stats["sessions_in_use"] += 1
+        _stats["peak_sessions_in_use"] = max(
+            _stats["peak_sessions_in_use"], _stats["sessions_in_use"]
+        )
+
+
+def _session_closed() -> None:
+    with _lock:
+        _stats["sessions_in_use"] -= 1
+
+
+@contextmanager
+def session(database: str = NEO4J_DATABASE, **kwargs: Any) -> Iterator[Session]:
+    """Opens a session on the shared driver and tracks pool utilisation."""
+    with get_driver().session(database=database, **kwargs) as neo4j_session:
+        _session_opened()
+        try:
+            yield neo4j_session
+        finally:
+            _session_closed()
+
+
+def get_async_driver(uri: str = NEO4J_URI) -> AsyncDriver:
+    """Returns the async driver for `uri` on the running event loop.
+
+    Async tools share it so concurrent sessions overlap their network I/O
+    instead of each blocking a thread.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        drivers = _async_drivers.setdefault(loop, {})
+        driver = drivers.get(uri)
+        if driver is None:
+            logger.info(
+                f"Creating async Neo4j driver for {uri} "
+                f"(pool size {NEO4J_MAX_POOL_SIZE})"
+            )
+            driver = AsyncGraphDatabase.driver(uri, **_pool_settings())
+            drivers[uri] = driver
+            _stats["drivers_created"] += 1
+    return driver
+
+
+@asynccontextmanager
+async def async_session(
+    database: str = NEO4J_DATABASE, **kwargs: Any
+) -> AsyncIterator[AsyncSession]:
+    """Async variant of `session` on the shared async driver."""
+    async with get_async_driver().session(database=database, **kwargs) as neo4j_session:
+        _session_opened()
+        try:
+            yield neo4j_session
+        finally:
+            _session_closed()
+
+
+def pool_metrics() -> dict[str, Any]:
+    """Returns a snapshot of driver/session counters for monitoring."""
+    with _lock:
+        metrics = dict(_stats)
+    metrics["max_pool_size"] = NEO4J_MAX_POOL_SIZE
+    metrics["pool_utilisation"] = metrics["sessions_in_use"] / NEO4J_MAX_POOL_SIZE
+    metrics["open_drivers"] = len(_drivers) + sum(
+        len(drivers) for drivers in _async_drivers.values()
+    )
+    return metrics
+
+
+def _close_async_driver(loop: asyncio.AbstractEventLoop, driver: AsyncDriver) -> None:
+    # An async driver can only be closed on the loop that created it.
+    if loop.is_closed():
+        return
+    if not loop.is_running():
+        loop.run_until_complete(driver.close())
+        return
+    try:
+        current = asyncio.get_running_loop()
+    except RuntimeError:
+        current = None
+    if loop is not current:
+        asyncio.run_coroutine_threadsafe(driver.close(), loop).result(_CLOSE_TIMEOUT)
+
+
+def close_drivers() -> None:
+    """Closes every pooled driver, sync and async. Safe to call more than once.
+
+    Async drivers are closed on their own event loops; drivers of a loop that
+    has already been closed are dropped, as their connections went with it.
+    """
+    with _lock:
+        drivers = list(_drivers.values())
+        _drivers.clear()
+        async_drivers = [
+            (loop, driver)
+            for loop, by_uri in _async_drivers.items()
+            for driver in by_uri.values()
+        ]
+        _async_drivers.clear()
+    for driver in drivers:
+        try:
+            driver.close()
+        except Exception as e:
+            logger.warning(f"Error closing Neo4j driver: {e}")
+    for loop, driver in async_drivers:
+        try:
+            _close_async_driver(loop, driver)
+        except Exception as e:
+            logger.warning(f"Error closing async Neo4j driver: {e}")
+
+
+async def close_async_drivers() -> None:
+    """Closes the async drivers created on the running event loop."""
+    with _lock:
+        drivers = list(_async_drivers.pop(asyncio.get_running_loop(), {}).values())
+    for driver in drivers:
+        try:
+            await driver.close()
+        except Exception as e:
+            logger.warning(f"Error closing async Neo4j driver: {e}")
@@ -0,0 +1,311 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from neo4j import GraphDatabase
+
+logger = logging.getLogger(__name__)
+
+# Neo4j connection details
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "mynewpassword")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "retail-graph")
+
+# Seconds to wait for new indexes to finish populating before giving up.
+INDEX_ONLINE_TIMEOUT = float(os.getenv("INDEX_ONLINE_TIMEOUT", "300"))
+_POLL_INTERVAL = 1.0
+
+_INDEX_KINDS = {"range": "RANGE INDEX", "text": "TEXT INDEX"}
+
+
+class SchemaItem:
+    """A desired constraint or index on one node label.
+
+    `kind` is "unique" for a uniqueness constraint, or the index type
+    "range", "text" or "fulltext".
+    """
+
+    def __init__(self, name: str, kind: str, label: str, properties: list[str]):
+        self.name = name
+        self.kind = kind
+        self.label = label
+        self.properties = list(properties)
+
+    @property
+    def is_constraint(self) -> bool:
+        return self.kind == "unique"
+
+    @property
+    def signature(self) -> tuple:
+        """What the item indexes, independent of its name."""
+        return self.kind, self.label, tuple(self.properties)
+
+    def create_statement(self) -> str:
+        props = ", ".join(f"n.{prop}" for prop in self.properties)
+        target = f"{self.name} IF NOT EXISTS FOR (n:{self.label})"
+        if self.kind == "unique":
+            return f"CREATE CONSTRAINT {target} REQUIRE ({props}) IS UNIQUE"
+        if self.kind == "fulltext":
+            return f"CREATE FULLTEXT INDEX {target} ON EACH [{props}]"
+        return f"CREATE {_INDEX_KINDS[self.kind]} {target} ON ({props})"
+
+    def drop_statement(self) -> str:
+        kind = "CONSTRAINT" if self.is_constraint else "INDEX"
+        return f"DROP {kind} {self.name} IF EXISTS"
+
+
+DESIRED_SCHEMA = [
+    # Merge keys of the load stages.
+    SchemaItem("transaction_id", "unique", "Transaction", ["id"]),
+    SchemaItem("customer_name", "unique", "Customer", ["name"]),
+    SchemaItem("product_name", "unique", "Product", ["name"]),
+    SchemaItem("city_name", "unique", "City", ["name"]),
+    SchemaItem("store_type", "unique", "Store", ["type"]),
+    # Time-window and filter predicates on transactions.
+    SchemaItem("transaction_datetime", "range", "Transaction", ["datetime"]),
+    SchemaItem("transaction_date", "range", "Transaction", ["date"]),
+    SchemaItem("transaction_year_month", "range", "Transaction", ["year", "month"]),
+    SchemaItem("transaction_week", "range", "Transaction", ["week"]),
+    SchemaItem("transaction_season", "range", "Transaction", ["season"]),
+    SchemaItem(
+        "transaction_payment_method", "range", "Transaction", ["payment_method"]
+    ),
+    SchemaItem("transaction_total_cost", "range", "Transaction", ["total_cost"]),
+    # CONTAINS / ENDS WITH lookups and fuzzy search on names.
+    SchemaItem("product_name_text", "text", "Product", ["name"]),
+    SchemaItem("customer_name_text", "text", "Customer", ["name"]),
+    SchemaItem("product_name_fulltext", "fulltext", "Product", ["name"]),
+    SchemaItem("customer_name_fulltext", "fulltext", "Customer", ["name"]),
+    # Precomputed aggregates written by `neo4j_ingest.py --aggregates`.
+    SchemaItem(
+        "sales_summary_dims",
+        "range",
+        "SalesSummary",
+        ["city", "season", "store_type", "payment_method"],
+    ),
+    SchemaItem("product_purchase_count", "range", "Product", ["purchase_count"]),
+]
+
+_SHOW_CONSTRAINTS = "SHOW CONSTRAINTS YIELD name, type, labelsOrTypes, properties"
+_SHOW_INDEXES = """
+SHOW INDEXES YIELD name, type, labelsOrTypes, properties, state,
+                   populationPercent, owningConstraint
+"""
+
+
+def _label(labels: list[str] | None) -> str:
+    return "|".join(labels or [])
+
+
+def read_live_schema(session) -> dict[str, dict]:
+    """Returns the database's constraints and indexes keyed by name.
+
+    Each entry has the SchemaItem-style `kind`, `label` and `properties`, the
+    `state` of the backing index and its `progress` in percent. Built-in
+    token lookup indexes are left out.
+    """
+    live = {}
+    owned = {}
+    for row in session.run(_SHOW_INDEXES):
+        entry = {
+            "kind": row["type"].lower(),
+            "label": _label(row["labelsOrTypes"]),
+            "properties": list(row["properties"] or []),
+            "state": row["state"],
+            "progress": row["populationPercent"],
+        }
+        if row["owningConstraint"]:
+            owned[row["owningConstraint"]] = entry
+        elif entry["kind"] != "lookup":
+            live[row["name"]] = entry
+    for row in session.run(_SHOW_CONSTRAINTS):
+        # UNIQUENESS in early 5.x, NODE_PROPERTY_UNIQUENESS later.
+        kind = "unique" if "UNIQUENESS" in row["type"] else row["type"].lower()
+        index = owned.get(row["name"], {})
+        live[row["name"]] = {
+            "kind": kind,
+            "label": _label(row["labelsOrTypes"]),
+            "properties": list(row["properties"] or []),
+            "state": index.get("state", "ONLINE"),
+            "progress": index.get("progress", 100.0),
+        }
+    return live
+
+
+def _signature(entry: dict) -> tuple:
+    return entry["kind"], entry["label"], tuple(entry["properties"])
+
+
+def match_live(desired: list[SchemaItem], live: dict[str, dict]) -> dict:
+    """Maps each desired name to the live item that satisfies it, or None.
+
+    Items match by name, or by definition when the database already has an
+    equivalent item under another name (CREATE ... IF NOT EXISTS then does
+    nothing, so the equivalent is what queries use).
+    """
+    by_signature = {_signature(entry): name for name, entry in live.items()}
+    matches = {}
+    for item in desired:
+        if item.name in live:
+            matches[item.name] = item.name
+        else:
+            matches[item.name] = by_signature.get(item.signature)
+    return matches
+
+
+def detect_drift(
+    desired: list[SchemaItem], live: dict[str, dict]
+) -> dict[str, list[str] | dict[str, str]]:
+    """Compares the desired schema with the live one.
+
+    Returns "missing" (declared but absent), "changed" (same name, different
+    definition), "extra" (present but not declared) and "not_online"
+    (declared items whose index is still populating or has failed).
+    """
+    matches = match_live(desired, live)
+    drift: dict = {"missing": [], "changed": [], "extra": [], "not_online": {}}
+    for item in desired:
+        name = matches[item.name]
+        if name is None:
+            drift["missing"].append(item.name)
+            continue
+        if _signature(live[name]) != item.signature:
+            drift["changed"].append(item.name)
+        if live[name]["state"] != "ONLINE":
+            drift["not_online"][item.name] = live[name]["state"]
+    used = set(matches.values())
+    drift["extra"] = sorted(name for name in live if name not in used)
+    return drift
+
+
+def has_drift(drift: dict) -> bool:
+    return any(drift.values())
+
+
+def apply_schema(
+    session, desired: list[SchemaItem] = DESIRED_SCHEMA, replace_changed=False
+) -> list[str]:
+    """Creates missing items; with `replace_changed`, also drops and recreates
+    items whose definition differs. Returns the names that were created."""
+    drift = detect_drift(desired, read_live_schema(session))
+    recreate = set(drift["changed"]) if replace_changed else set()
+    created = []
+    for item in desired:
+        if item.name in recreate:
+            session.run(item.drop_statement()).consume()
+        if item.name in recreate or item.name in drift["missing"]:
+            session.run(item.create_statement()).consume()
+            created.append(item.name)
+    for name in drift["changed"]:
+        if name not in recreate:
+            logger.warning(f"Index {name} differs from its declaration; left as is")
+    if created:
+        logger.info(f"Created {len(created)} constraint(s)/index(es): {created}")
+    return created
+
+
+def wait_for_online(
+    session,
+    desired: list[SchemaItem] = DESIRED_SCHEMA,
+    timeout: float = INDEX_ONLINE_TIMEOUT,
+) -> None:
+    """Blocks until every declared item's index is ONLINE.
+
+    Raises RuntimeError if an index failed to populate and TimeoutError if
+    population takes longer than `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        live = read_live_schema(session)
+        pending = {}
+        for item_name, name in match_live(desired, live).items():
+            if name is None:
+                continue
+            state = live[name]["state"]
+            if state == "FAILED":
+                raise RuntimeError(
+                    f"Index {name} failed to populate; drop it, fix the data and "
+                    "apply again"
+                )
+            if state != "ONLINE":
+                pending[item_name] = live[name]["progress"]
+        if not pending:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(
+                f"Indexes still populating after {timeout:g}s: {sorted(pending)}"
+            )
+        logger.info(
+            "Waiting for indexes: "
+            + ", ".join(f"{name} {progress:.0f}%" for name, progress in pending.items())
+        )
+        time.sleep(_POLL_INTERVAL)
+
+
+def ensure_schema(
+    session,
+    desired: list[SchemaItem] = DESIRED_SCHEMA,
+    timeout: float = INDEX_ONLINE_TIMEOUT,
+    replace_changed: bool = False,
+) -> dict:
+    """Applies the desired schema, waits for it to come online and returns
+    the remaining drift (normally only "extra" items, if any)."""
+    apply_schema(session, desired, replace_changed)
+    wait_for_online(session, desired, timeout)
+    drift = detect_drift(desired, read_live_schema(session))
+    if has_drift(drift):
+        logger.warning(f"Schema drift after apply: {json.dumps(drift)}")
+    return drift
+
+
+def check_schema(driver, database: str = NEO4J_DATABASE) -> dict:
+    """Reports drift of the live database against DESIRED_SCHEMA."""
+    with driver.session(database=database) as session:
+        return detect_drift(DESIRED_SCHEMA, read_live_schema(session))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Report drift of the retail graph's constraints and indexes "
+        "against DESIRED_SCHEMA (exit status 1 if any), or apply them."
+    )
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="create missing constraints and indexes and wait until they are online",
+    )
+    parser.add_argument(
+        "--replace-changed",
+        action="store_true",
+        help="with --apply, drop and recreate items whose definition changed",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=INDEX_ONLINE_TIMEOUT,
+        help="seconds to wait for indexes to come online (env INDEX_ONLINE_TIMEOUT)",
+    )
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        if args.apply:
+            with driver.session(database=NEO4J_DATABASE) as session:
+                drift = ensure_schema(
+                    session, timeout=args.timeout, replace_changed=args.replace_changed
+                )
+        else:
+            drift = check_schema(driver)
+    finally:
+        driver.close()
+    print(json.dumps(drift, indent=2))
+    sys.exit(1 if has_drift(drift) else 0)
+
+
+if __name__ == "__main__":
+    main()
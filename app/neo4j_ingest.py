@@ -1,124 +1,1269 @@
-import ast
+import argparse
+import contextlib
+import csv
+import json
 import logging
 import os
+import queue
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
 
 import pandas as pd
 from neo4j import GraphDatabase
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+if __package__:
+    from app.neo4j_indexes import ensure_schema
+else:
+    from neo4j_indexes import ensure_schema
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Neo4j connection details
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://127.0.0.1:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "mynewpassword")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "retail-graph")
 
+# CSV column -> Cypher parameter key for the per-transaction batch rows.
+CSV_COLUMNS = {
+    "Transaction_ID": "id",
+    "Date": "date",
+    "Customer_Name": "customer_name",
+    "Customer_Category": "customer_category",
+    "Product": "products",
+    "Total_Items": "total_items",
+    "Total_Cost": "total_cost",
+    "Payment_Method": "payment_method",
+    "City": "city",
+    "Store_Type": "store_type",
+    "Discount_Applied": "discount_applied",
+    "Season": "season",
+    "Promotion": "promotion",
+}
+
+# Format of the CSV Date column; rows that do not match are stored without
+# date properties.
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Explicit dtypes skip type inference and keep low-cardinality text compact.
+CSV_DTYPES = {
+    "Transaction_ID": str,
+    "Date": str,
+    "Customer_Name": str,
+    "Customer_Category": "category",
+    "Product": str,
+    "Total_Items": "int32",
+    "Total_Cost": "float64",
+    "Payment_Method": "category",
+    "City": "category",
+    "Store_Type": "category",
+    "Discount_Applied": "boolean",
+    "Season": "category",
+    "Promotion": "category",
+}
+
+# Text columns with few distinct values, read as categoricals.
+CATEGORY_COLUMNS = [
+    column for column, dtype in CSV_DTYPES.items() if dtype == "category"
+]
+# File extensions read with pyarrow instead of the CSV reader.
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+# Rows parsed per chunk, and the memory the chunks in flight may use.
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "50000"))
+INGEST_MAX_MEMORY_MB = int(os.getenv("INGEST_MAX_MEMORY_MB", "512"))
+# Rows sent to Neo4j per UNWIND statement: the starting point and bounds of
+# the adaptive batch size, and the commit latency it steers towards (seconds).
+BATCH_SIZE = 1000
+INGEST_MIN_BATCH_SIZE = int(os.getenv("INGEST_MIN_BATCH_SIZE", "500"))
+INGEST_MAX_BATCH_SIZE = int(os.getenv("INGEST_MAX_BATCH_SIZE", "50000"))
+INGEST_TARGET_BATCH_SECONDS = float(os.getenv("INGEST_TARGET_BATCH_SECONDS", "1.0"))
+# Batches shrink while less than this share of system memory is available.
+INGEST_MIN_FREE_MEMORY = float(os.getenv("INGEST_MIN_FREE_MEMORY", "0.1"))
+# Concurrent writer sessions, and how long a batch that hits a deadlock or
+# other transient error is retried before the load fails (seconds).
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_MAX_RETRY_TIME = float(os.getenv("INGEST_MAX_RETRY_TIME", "60"))
+# Most keys per dimension remembered as already merged. Cities, stores and
+# products stay far below it; customers beyond it are merged again, which
+# MERGE makes harmless, so memory stays bounded however many there are.
+INGEST_MAX_TRACKED_KEYS = int(os.getenv("INGEST_MAX_TRACKED_KEYS", "100000"))
+# One chunk is being written, one waits in the queue, one is being parsed.
+_CHUNKS_IN_FLIGHT = 3
+# Prepared and staged rows take about twice the memory of the frame they came
+# from on top of the frame itself.
+_RECORD_OVERHEAD = 3
+
+# A quoted item of a Python list literal such as "['Milk', \"Campbell's\"]".
+# Matching up to a quote followed by "," or "]" keeps apostrophes inside
+# double-quoted names intact.
+PRODUCT_ITEM = re.compile(r"""['"](.*?)['"](?=\s*[,\]])""")
+
+# The load runs in stages, each its own UNWIND pass. Dimension nodes are
+# merged first, once per distinct key in a chunk, so the transaction passes only
+# look them up instead of re-merging the same few City/Store nodes per row.
+STAGE_QUERIES = {
+    "customers": """
+UNWIND $rows AS row
+MERGE (c:Customer {name: row.name})
+ON CREATE SET c.category = row.category
+""",
+    "cities": "UNWIND $rows AS name MERGE (:City {name: name})",
+    "stores": "UNWIND $rows AS type MERGE (:Store {type: type})",
+    "products": "UNWIND $rows AS name MERGE (:Product {name: name})",
+    "transactions": """
+UNWIND $rows AS row
+MERGE (t:Transaction {id: row.id})
+SET t.datetime = row.datetime,
+    t.date = row.date,
+    t.year = row.year,
+    t.month = row.month,
+    t.week = row.week,
+    t.total_items = row.total_items,
+    t.total_cost = row.total_cost,
+    t.payment_method = row.payment_method,
+    t.discount_applied = row.discount_applied,
+    t.season = row.season,
+    t.promotion = row.promotion
+""",
+    # One pass per relationship, so a row missing one dimension still gets
+    # the other links.
+    "made": """
+UNWIND $rows AS row
+MATCH (t:Transaction {id: row.id})
+MATCH (c:Customer {name: row.customer_name})
+MERGE (c)-[:MADE]->(t)
+""",
+    "at": """
+UNWIND $rows AS row
+MATCH (t:Transaction {id: row.id})
+MATCH (s:Store {type: row.store_type})
+MERGE (t)-[:AT]->(s)
+""",
+    "in_city": """
+UNWIND $rows AS row
+MATCH (t:Transaction {id: row.id})
+MATCH (cy:City {name: row.city})
+MERGE (t)-[:IN_CITY]->(cy)
+""",
+    "product_links": """
+UNWIND $rows AS row
+MATCH (t:Transaction {id: row.id})
+UNWIND row.products AS name
+MATCH (p:Product {name: name})
+MERGE (t)-[:CONTAINS]->(p)
+""",
+}
+_TRANSACTION_STAGES = frozenset(
+    {"transactions", "made", "at", "in_city", "product_links"}
+)
+# Relationship stages keyed by the dimension column they link to.
+_LINK_COLUMNS = {"made": "customer_name", "at": "store_type", "in_city": "city"}
+# Dimension stages with the label and key property of the nodes they merge.
+DIMENSION_KEYS = {
+    "customers": ("Customer", "name"),
+    "cities": ("City", "name"),
+    "stores": ("Store", "type"),
+    "products": ("Product", "name"),
+}
+
+DATA_VERSION_BUMP = """
+MERGE (m:_Meta {key: 'data_version'})
+SET m.version = coalesce(m.version, 0) + 1, m.updated_at = datetime()
+"""
+
+# High-water mark of loaded transactions, kept next to the data version so
+# incremental runs can skip rows that are already in the graph.
+INGEST_STATE_QUERY = """
+MATCH (m:_Meta {key: 'ingest_state'}) RETURN m.max_transaction_id AS mark
+"""
+INGEST_STATE_UPDATE = """
+MERGE (m:_Meta {key: 'ingest_state'})
+SET m.max_transaction_id = CASE
+        WHEN m.max_transaction_id >= $mark THEN m.max_transaction_id
+        ELSE $mark
+    END,
+    m.source = $source,
+    m.updated_at = datetime()
+"""
+
+# Optional post-ingest stage: summaries that answer the common questions
+# without scanning every Transaction. Each step rebuilds its aggregate from the
+# whole graph in one transaction, so readers never see it half-built. Loads
+# without --aggregates leave them stale; AGGREGATES_STAMP records the data
+# version they match, and the agent's schema hides them once it moves on.
+AGGREGATE_QUERIES = {
+    "sales_summary": [
+        "MATCH (m:SalesSummary) DETACH DELETE m",
+        """
+MATCH (t:Transaction)-[:IN_CITY]->(cy:City)
+MATCH (t)-[:AT]->(s:Store)
+WITH cy.name AS city,
+     coalesce(t.season, 'Unknown') AS season,
+     s.type AS store_type,
+     coalesce(t.payment_method, 'Unknown') AS payment_method,
+     count(t) AS transactions,
+     sum(t.total_cost) AS revenue,
+     sum(t.total_items) AS items
+CREATE (:SalesSummary {
+    city: city,
+    season: season,
+    store_type: store_type,
+    payment_method: payment_method,
+    transactions: transactions,
+    revenue: revenue,
+    items: items,
+    avg_basket_size: toFloat(items) / transactions
+})
+""",
+    ],
+    "product_counts": [
+        """
+MATCH (p:Product)
+SET p.purchase_count = COUNT { (p)<-[:CONTAINS]-(:Transaction) }
+""",
+    ],
+    "co_purchases": [
+        "MATCH (:Product)-[r:BOUGHT_WITH]->(:Product) DELETE r",
+        """
+MATCH (a:Product)<-[:CONTAINS]-(t:Transaction)-[:CONTAINS]->(b:Product)
+WHERE a.name < b.name
+WITH a, b, count(t) AS together
+CREATE (a)-[:BOUGHT_WITH {count: together}]->(b)
+""",
+    ],
+}
+
+# Appended to DATA_VERSION_BUMP (or to DATA_VERSION_MATCH when the load added
+# no rows) when the aggregates were rebuilt by this load.
+DATA_VERSION_MATCH = """
+MERGE (m:_Meta {key: 'data_version'})
+"""
+AGGREGATES_STAMP = """
+WITH m
+MERGE (a:_Meta {key: 'aggregates'})
+SET a.data_version = m.version, a.updated_at = datetime()
+"""
+
+# neo4j-admin import files: file stem -> (label or relationship type, header).
+# Labels and types are given on the import command line, so the files carry no
+# :LABEL or :TYPE column.
+OFFLINE_NODES = {
+    "customers": ("Customer", ["name:ID(Customer)", "category"]),
+    "cities": ("City", ["name:ID(City)"]),
+    "stores": ("Store", ["type:ID(Store)"]),
+    "products": ("Product", ["name:ID(Product)"]),
+    "transactions": (
+        "Transaction",
+        [
+            "id:ID(Transaction)",
+            "datetime:localdatetime",
+            "date:date",
+            "year:int",
+            "month:int",
+            "week:int",
+            "total_items:long",
+            "total_cost:double",
+            "payment_method",
+            "discount_applied:boolean",
+            "season",
+            "promotion",
+        ],
+    ),
+}
+OFFLINE_RELATIONSHIPS = {
+    "made": ("MADE", [":START_ID(Customer)", ":END_ID(Transaction)"]),
+    "at": ("AT", [":START_ID(Transaction)", ":END_ID(Store)"]),
+    "in_city": ("IN_CITY", [":START_ID(Transaction)", ":END_ID(City)"]),
+    "contains": ("CONTAINS", [":START_ID(Transaction)", ":END_ID(Product)"]),
+}
+
+
+def parse_product_lists(products: pd.Series) -> pd.Series:
+    """Parses stringified product lists into Python lists of names.
+
+    Replaces a per-cell `ast.literal_eval`; missing or malformed cells become
+    empty lists. Columns read from Parquet/Arrow already hold lists and are
+    passed through.
+    """
+    present = products.dropna()
+    if len(present) and isinstance(present.iloc[0], list):
+        return products.map(lambda items: items if isinstance(items, list) else [])
+    parsed = products.astype("string").str.findall(PRODUCT_ITEM)
+    return parsed.map(lambda items: items if isinstance(items, list) else [])
+
+
+def date_columns(dates: pd.Series) -> dict[str, pd.Series]:
+    """Parses the Date column into the typed properties stored on Transaction.
+
+    `datetime` becomes a Neo4j LocalDateTime and `date` a Date; `year`,
+    `month` and ISO `week` are derived so time-window filters hit range
+    indexes instead of string functions. Unparseable dates become null.
+    """
+    parsed = pd.to_datetime(dates, format=DATE_FORMAT, errors="coerce")
+    present = parsed.notna()
+
+    def nullable(column: pd.Series) -> pd.Series:
+        return column.astype(object).where(present, None)
+
+    # pandas Timestamps are datetime subclasses the driver sends natively.
+    return {
+        "datetime": nullable(parsed),
+        "date": nullable(parsed.dt.date),
+        "year": nullable(parsed.dt.year.astype("Int64")),
+        "month": nullable(parsed.dt.month.astype("Int64")),
+        "week": nullable(parsed.dt.isocalendar().week.astype("Int64")),
+    }
+
+
+def prepare_transactions(frame: pd.DataFrame) -> list[dict]:
+    """Converts raw CSV rows into the parameter dicts the ingest query UNWINDs.
+
+    All coercion is done column-wise; records are then zipped from native
+    Python column lists, which is much cheaper than `DataFrame.to_dict`
+    boxing every cell.
+    """
+    batch = frame[list(CSV_COLUMNS)].rename(columns=CSV_COLUMNS)
+    columns = {
+        "id": batch["id"].astype(str),
+        **date_columns(batch["date"]),
+        "products": parse_product_lists(batch["products"]),
+        "total_items": batch["total_items"].astype("int64"),
+        "total_cost": batch["total_cost"].astype("float64"),
+        "discount_applied": batch["discount_applied"].fillna(False).astype(bool),
+    }
+    for key in CSV_COLUMNS.values():
+        if key not in columns:
+            # Empty text cells are NaN in pandas; Neo4j wants null.
+            column = batch[key].astype(object)
+            columns[key] = column.where(column.notna(), None)
+    keys = list(columns)
+    values = [columns[key].tolist() for key in keys]
+    return [dict(zip(keys, row, strict=True)) for row in zip(*values, strict=True)]
+
+
+def stage_rows(transactions: list[dict]) -> dict[str, list]:
+    """Splits prepared transactions into the rows of each load stage, in the
+    order of STAGE_QUERIES.
+
+    Dimension keys are deduplicated and sorted, so concurrent loads lock
+    shared nodes in the same order.
+    """
+    customers: dict[str, str | None] = {}
+    for row in transactions:
+        customers.setdefault(row["customer_name"], row["customer_category"])
+    customers.pop(None, None)
+    cities = {row["city"] for row in transactions} - {None}
+    stores = {row["store_type"] for row in transactions} - {None}
+    products = {name for row in transactions for name in row["products"]}
+    return {
+        "customers": [
+            {"name": name, "category": customers[name]} for name in sorted(customers)
+        ],
+        "cities": sorted(cities),
+        "stores": sorted(stores),
+        "products": sorted(products),
+        "transactions": transactions,
+        **{
+            stage: [
+                {"id": row["id"], column: row[column]}
+                for row in transactions
+                if row[column] is not None
+            ]
+            for stage, column in _LINK_COLUMNS.items()
+        },
+        "product_links": [
+            {"id": row["id"], "products": row["products"]}
+            for row in transactions
+            if row["products"]
+        ],
+    }
+
+
+def partition_rows(stage: str, rows: list, workers: int) -> list[list]:
+    """Splits a stage's rows between writer sessions.
+
+    Transaction-keyed rows are partitioned by a hash of the transaction id, so
+    every write to one transaction happens in the same worker. Dimension keys
+    are already distinct and are split into contiguous, still sorted slices.
+    """
+    if not rows:
+        return []
+    if workers <= 1:
+        return [rows]
+    if stage in _TRANSACTION_STAGES:
+        partitions: list[list] = [[] for _ in range(workers)]
+        for row in rows:
+            partitions[zlib.crc32(row["id"].encode("utf-8")) % workers].append(row)
+        return [partition for partition in partitions if partition]
+    size = -(-len(rows) // workers)
+    return [rows[i : i + size] for i in range(0, len(rows), size)]
+
+
+class HighWaterMark:
+    """Tracks the largest numeric Transaction_ID streamed through `filter`.
+
+    With a `start` mark, rows at or below it are dropped as already loaded.
+    Rows whose id is not numeric are always kept.
+    """
+
+    def __init__(self, start: int | None = None):
+        self.start = start
+        self.value = start
+
+    def filter(self, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            ids = pd.to_numeric(chunk["Transaction_ID"], errors="coerce")
+            if self.start is not None:
+                fresh = ~(ids <= self.start)
+                chunk, ids = chunk[fresh], ids[fresh]
+            if ids.notna().any():
+                top = int(ids.max())
+                self.value = top if self.value is None else max(self.value, top)
+            if len(chunk):
+                yield chunk
+
+
+class DimensionTracker:
+    """Remembers dimension keys already written, so each Customer, City,
+    Store and Product is usually merged once per run.
+
+    Given a driver, keys not seen yet in this run are first looked up in the
+    graph, and only keys missing there are merged (incremental mode). Each
+    dimension keeps at most `max_keys` keys, least recently seen dropped
+    first, so a key may occasionally be merged (or exported) again.
+    """
+
+    def __init__(self, driver=None, max_keys: int = INGEST_MAX_TRACKED_KEYS):
+        self.driver = driver
+        self.max_keys = max_keys
+        self.known: dict[str, OrderedDict[str, None]] = {
+            stage: OrderedDict() for stage in DIMENSION_KEYS
+        }
+
+    def new_rows(self, stage: str, rows: list) -> list:
+        if stage not in DIMENSION_KEYS:
+            return rows
+        known = self.known[stage]
+        fresh = []
+        for row in rows:
+            key = _dimension_key(row)
+            if key in known:
+                known.move_to_end(key)
+            else:
+                fresh.append(row)
+        if fresh and self.driver is not None:
+            existing = self._existing(stage, [_dimension_key(row) for row in fresh])
+            fresh = [row for row in fresh if _dimension_key(row) not in existing]
+            self._remember(stage, existing)
+        self._remember(stage, (_dimension_key(row) for row in fresh))
+        return fresh
+
+    def _remember(self, stage: str, keys) -> None:
+        known = self.known[stage]
+        for key in keys:
+            known[key] = None
+        while len(known) > self.max_keys:
+            known.popitem(last=False)
+
+    def _existing(self, stage: str, keys: list[str]) -> set[str]:
+        label, prop = DIMENSION_KEYS[stage]
+        query = (
+            f"UNWIND $keys AS key MATCH (n:{label} {{{prop}: key}}) "
+            "RETURN collect(key) AS keys"
+        )
+        existing: set[str] = set()
+        with self.driver.session(database=NEO4J_DATABASE) as session:
+            for i in range(0, len(keys), BATCH_SIZE):
+                record = session.run(query, keys=keys[i : i + BATCH_SIZE]).single()
+                existing.update(record["keys"])
+        return existing
+
+
+def _dimension_key(row) -> str:
+    # Customer rows carry a category; the other dimensions are bare keys.
+    return row["name"] if isinstance(row, dict) else row
+
+
+class IngestStats:
+    """Thread-safe timings, throughput and server counters of one load.
+
+    Phases are "parse" (reading the input), "transform" (preparing rows),
+    "write" (client-side time per batch transaction, summed over workers)
+    and "server" (the server's reported execution time for those batches);
+    write minus server is network round-trips and commit.
+    """
+
+    COUNTERS = (
+        "nodes_created",
+        "relationships_created",
+        "properties_set",
+        "labels_added",
+    )
+
+    def __init__(self, total_rows: int | None = None):
+        self.total_rows = total_rows
+        self.started = time.perf_counter()
+        self.scanned = 0
+        self.rows = 0
+        self.batches = 0
+        self.seconds: defaultdict[str, float] = defaultdict(float)
+        self.stage_seconds: defaultdict[str, float] = defaultdict(float)
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[phase] += seconds
+
+    def reading(self, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Times the "parse" phase and counts input rows as they are read."""
+        while True:
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            self.add_time("parse", time.perf_counter() - started)
+            if chunk is None:
+                return
+            self.scanned += len(chunk)
+            yield chunk
+
+    def timed(self, phase: str, func: Callable[[pd.DataFrame], T]) -> Callable:
+        def wrapper(frame: pd.DataFrame) -> T:
+            started = time.perf_counter()
+            try:
+                return func(frame)
+            finally:
+                self.add_time(phase, time.perf_counter() - started)
+
+        return wrapper
+
+    def record_batch(self, stage: str, seconds: float, summary) -> None:
+        server_ms = (summary.result_available_after or 0) + (
+            summary.result_consumed_after or 0
+        )
+        with self._lock:
+            self.batches += 1
+            self.seconds["write"] += seconds
+            self.seconds["server"] += server_ms / 1000
+            self.stage_seconds[stage] += seconds
+            for name in self.COUNTERS:
+                self.counters[name] += getattr(summary.counters, name)
+
+    def progress(self, rows: int) -> str:
+        """Adds written rows and returns a progress line with rate and ETA."""
+        self.rows += rows
+        elapsed = time.perf_counter() - self.started
+        line = f"Processed {self.rows} rows ({self.rows / elapsed:,.0f} rows/s)"
+        if self.total_rows and self.scanned:
+            remaining = max(0, self.total_rows - self.scanned)
+            line += f", ETA {remaining * elapsed / self.scanned:,.0f}s"
+        return line
+
+    def summary(self) -> dict:
+        """Machine-readable totals for the whole load."""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            seconds = dict(self.seconds)
+            seconds["network_and_commit"] = max(
+                0.0, seconds.get("write", 0.0) - seconds.get("server", 0.0)
+            )
+            return {
+                "rows": self.rows,
+                "rows_scanned": self.scanned,
+                "elapsed_seconds": round(elapsed, 3),
+                "rows_per_second": round(self.rows / elapsed, 1) if elapsed else 0.0,
+                "batches": self.batches,
+                "seconds": {k: round(v, 3) for k, v in seconds.items()},
+                "stage_seconds": {
+                    k: round(v, 3) for k, v in self.stage_seconds.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+
+def estimate_total_rows(path: str) -> int | None:
+    """Row count of the input: exact for Parquet/Arrow, extrapolated from the
+    first MiB for CSV. Used for the ETA only."""
+    try:
+        if path.lower().endswith(PARQUET_EXTENSIONS):
+            _, pq = _import_pyarrow()
+            return pq.ParquetFile(path).metadata.num_rows
+        if path.lower().endswith(ARROW_EXTENSIONS):
+            pa, _ = _import_pyarrow()
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                return sum(
+                    reader.get_batch(i).num_rows
+                    for i in range(reader.num_record_batches)
+                )
+        with open(path, "rb") as f:
+            sample = f.read(1024 * 1024)
+        lines = sample.count(b"\n")
+        size = os.path.getsize(path)
+        if not lines or len(sample) == size:
+            return max(0, lines - 1)
+        return max(0, int(size * lines / len(sample)) - 1)
+    except (ImportError, OSError):
+        return None
+
+
+def _available_memory_share() -> float | None:
+    """MemAvailable / MemTotal from /proc/meminfo, or None where unsupported."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            info = dict(line.split(":", 1) for line in f)
+        return int(info["MemAvailable"].split()[0]) / int(info["MemTotal"].split()[0])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class BatchSizer:
+    """Adapts the rows per write transaction to the observed commit latency.
+
+    Batches grow by half while they commit in under half the target latency,
+    and shrink towards the target (at most halving) when they take longer or
+    system memory runs low. With `fixed`, the size never changes.
+    """
+
+    def __init__(
+        self,
+        initial: int = BATCH_SIZE,
+        min_size: int = INGEST_MIN_BATCH_SIZE,
+        max_size: int = INGEST_MAX_BATCH_SIZE,
+        target_seconds: float = INGEST_TARGET_BATCH_SECONDS,
+        fixed: int | None = None,
+        memory_share: Callable[[], float | None] = _available_memory_share,
+    ):
+        if fixed:
+            initial = min_size = max_size = fixed
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.size = min(max(initial, self.min_size), self.max_size)
+        self.target_seconds = target_seconds
+        self._memory_share = memory_share
+        self._lock = threading.Lock()
+
+    def observe(self, rows: int, seconds: float) -> None:
+        """Adjusts the size after a batch of `rows` committed in `seconds`."""
+        if self.min_size == self.max_size or rows <= 0:
+            return
+        memory = self._memory_share()
+        low_memory = memory is not None and memory < INGEST_MIN_FREE_MEMORY
+        with self._lock:
+            # Short final batches are scaled up to what a full batch would take.
+            latency = seconds * self.size / rows
+            if low_memory:
+                size = self.size // 2
+            elif latency > self.target_seconds:
+                size = int(self.size * max(0.5, self.target_seconds / latency))
+            elif latency < self.target_seconds / 2:
+                size = int(self.size * 1.5)
+            else:
+                return
+            self.size = min(max(size, self.min_size), self.max_size)
+
+
+def _write_batch(tx, query: str, rows: list):
+    return tx.run(query, rows=rows).consume()
+
+
+def write_stage(
+    driver,
+    stage: str,
+    rows: list,
+    stats: IngestStats | None = None,
+    sizer: BatchSizer | None = None,
+) -> None:
+    """Writes one partition of a stage in transactions sized by `sizer`.
+
+    Managed write transactions retry deadlocks and other transient errors
+    with backoff, for up to INGEST_MAX_RETRY_TIME seconds per batch.
+    """
+    sizer = sizer or BatchSizer(fixed=BATCH_SIZE)
+    with driver.session(database=NEO4J_DATABASE) as session:
+        i = 0
+        while i < len(rows):
+            batch = rows[i : i + sizer.size]
+            started = time.perf_counter()
+            summary = session.execute_write(_write_batch, STAGE_QUERIES[stage], batch)
+            seconds = time.perf_counter() - started
+            sizer.observe(len(batch), seconds)
+            if stats is not None:
+                stats.record_batch(stage, seconds, summary)
+            i += len(batch)
+
 
-def ingest_data(csv_path):
-    """Ingests retail transaction data into Neo4j."""
+def prepare_stages(frame: pd.DataFrame) -> dict[str, list]:
+    """Prepares one CSV chunk for the staged load."""
+    return stage_rows(prepare_transactions(frame))
+
+
+def _chunk_rows(row_bytes: float, chunk_size: int, max_memory_mb: int) -> int:
+    """Rows per chunk that keep the chunks in flight within `max_memory_mb`."""
+    budget = max_memory_mb * 1024 * 1024 / _CHUNKS_IN_FLIGHT
+    return max(1, min(chunk_size, int(budget / (row_bytes * _RECORD_OVERHEAD))))
+
+
+def read_csv_chunks(
+    csv_path: str,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    max_memory_mb: int = INGEST_MAX_MEMORY_MB,
+) -> Iterator[pd.DataFrame]:
+    """Streams the CSV in chunks of at most `chunk_size` rows.
+
+    Only the ingested columns are parsed, with explicit dtypes. A small first
+    chunk measures the row size, and later chunks are shrunk so that the
+    chunks in flight stay within `max_memory_mb`.
+    """
+    size = min(chunk_size, BATCH_SIZE)
+    with pd.read_csv(
+        csv_path, usecols=list(CSV_COLUMNS), dtype=CSV_DTYPES, iterator=True
+    ) as reader:
+        while True:
+            try:
+                chunk = reader.get_chunk(size)
+            except StopIteration:
+                return
+            row_bytes = chunk.memory_usage(deep=True).sum() / len(chunk)
+            size = _chunk_rows(row_bytes, chunk_size, max_memory_mb)
+            yield chunk
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet/Arrow input needs pyarrow: uv sync --extra columnar"
+        ) from e
+    return pa, pq
+
+
+def _arrow_schema(pa):
+    """Arrow schema for converted files; products are a native list column."""
+    types = {
+        "Product": pa.list_(pa.string()),
+        "Total_Items": pa.int32(),
+        "Total_Cost": pa.float64(),
+        "Discount_Applied": pa.bool_(),
+    }
+    return pa.schema(
+        [(column, types.get(column, pa.string())) for column in CSV_COLUMNS]
+    )
+
+
+def _arrow_to_frame(pa, batch) -> pd.DataFrame:
+    table = pa.Table.from_batches([batch])
+    frame = table.drop_columns(["Product"]).to_pandas()
+    frame["Product"] = table.column("Product").to_pylist()
+    return frame
+
+
+def read_columnar_chunks(
+    path: str,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    max_memory_mb: int = INGEST_MAX_MEMORY_MB,
+    memory_map: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """Streams a Parquet or Arrow IPC file in chunks of at most `chunk_size`
+    rows, with the same memory ceiling as read_csv_chunks.
+
+    No text is parsed: products arrive as lists. With `memory_map`, the file is
+    mapped instead of read, so the OS pages columns in on demand.
+    """
+    pa, pq = _import_pyarrow()
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        parquet = pq.ParquetFile(
+            path, memory_map=memory_map, read_dictionary=CATEGORY_COLUMNS
+        )
+        metadata = parquet.metadata
+        row_bytes = sum(
+            metadata.row_group(i).total_byte_size
+            for i in range(metadata.num_row_groups)
+        ) / max(1, metadata.num_rows)
+        size = _chunk_rows(row_bytes, chunk_size, max_memory_mb)
+        for batch in parquet.iter_batches(batch_size=size, columns=list(CSV_COLUMNS)):
+            yield _arrow_to_frame(pa, batch)
+        return
+
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    with source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(list(CSV_COLUMNS))
+            size = _chunk_rows(
+                batch.nbytes / max(1, batch.num_rows), chunk_size, max_memory_mb
+            )
+            for offset in range(0, batch.num_rows, size):
+                yield _arrow_to_frame(pa, batch.slice(offset, size))
+
+
+def read_chunks(
+    path: str,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    max_memory_mb: int = INGEST_MAX_MEMORY_MB,
+    memory_map: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """Streams CSV, Parquet or Arrow IPC input, chosen by file extension."""
+    if path.lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS):
+        return read_columnar_chunks(path, chunk_size, max_memory_mb, memory_map)
+    return read_csv_chunks(path, chunk_size, max_memory_mb)
+
+
+def convert_csv(
+    csv_path: str,
+    output_path: str,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    max_memory_mb: int = INGEST_MAX_MEMORY_MB,
+) -> int:
+    """Converts the retail CSV to Parquet or Arrow IPC (by `output_path`
+    extension), parsing the product lists once into a native list column.
+
+    Returns the number of rows written.
+    """
+    pa, pq = _import_pyarrow()
+    schema = _arrow_schema(pa)
+    if output_path.lower().endswith(PARQUET_EXTENSIONS):
+        writer = pq.ParquetWriter(output_path, schema)
+    else:
+        writer = pa.ipc.new_file(output_path, schema)
+    rows = 0
+    with writer:
+        for chunk in read_csv_chunks(csv_path, chunk_size, max_memory_mb):
+            chunk = chunk.astype(dict.fromkeys(CATEGORY_COLUMNS, object))
+            chunk["Product"] = parse_product_lists(chunk["Product"])
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+            rows += len(chunk)
+            logger.info(f"Converted {rows} rows")
+    return rows
+
+
+def prepare_in_background(
+    chunks: Iterator[pd.DataFrame],
+    prepare: Callable[[pd.DataFrame], T] = prepare_transactions,
+) -> Iterator[T]:
+    """Parses and prepares the next chunk on a worker thread while the caller
+    writes the current one to Neo4j."""
+    ready: queue.Queue = queue.Queue(maxsize=1)
+    done = object()
+
+    def produce():
+        try:
+            for chunk in chunks:
+                ready.put(prepare(chunk))
+            ready.put(done)
+        except Exception as e:
+            ready.put(e)
+
+    threading.Thread(target=produce, name="ingest-reader", daemon=True).start()
+    while (item := ready.get()) is not done:
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def ingest_data(
+    csv_path,
+    chunk_size=INGEST_CHUNK_SIZE,
+    max_memory_mb=INGEST_MAX_MEMORY_MB,
+    workers=INGEST_WORKERS,
+    incremental=False,
+    memory_map=False,
+    stats_path=None,
+    batch_size=None,
+    min_batch_size=INGEST_MIN_BATCH_SIZE,
+    max_batch_size=INGEST_MAX_BATCH_SIZE,
+    aggregates=False,
+):
+    """Ingests retail transaction data into Neo4j.
+
+    `csv_path` may also be a Parquet or Arrow IPC file written by convert_csv,
+    optionally memory-mapped. The input is streamed in chunks, so memory stays
+    bounded by `max_memory_mb` regardless of file size and the first batches
+    reach Neo4j while the rest of the file is still being parsed. Each stage
+    of a chunk is written by `workers` concurrent sessions; a stage finishes
+    before the next starts, so relationships always find their nodes. Each
+    stage adapts its batch size between `min_batch_size` and `max_batch_size`
+    to the observed commit latency, unless a fixed `batch_size` is given.
+
+    With `incremental`, rows up to the Transaction_ID high-water mark recorded
+    by earlier runs are skipped, and only dimension keys missing from the
+    graph are merged. With `aggregates`, the summaries in AGGREGATE_QUERIES
+    are rebuilt once the rows are loaded.
+
+    Returns the IngestStats summary, which is also logged as JSON and, with
+    `stats_path`, written to that file.
+    """
 
     if not os.path.exists(csv_path):
         logger.error(f"CSV file not found at {csv_path}")
         return
 
-    logger.info(f"Reading CSV from {csv_path}...")
-    df = pd.read_csv(csv_path)
+    logger.info(f"Streaming CSV from {csv_path}...")
 
     # Initializing Neo4j driver
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-
-    query_constraints = [
-        "CREATE CONSTRAINT transaction_id IF NOT EXISTS FOR (t:Transaction) REQUIRE t.id IS UNIQUE",
-        "CREATE CONSTRAINT customer_name IF NOT EXISTS FOR (c:Customer) REQUIRE c.name IS UNIQUE",
-        "CREATE CONSTRAINT product_name IF NOT EXISTS FOR (p:Product) REQUIRE p.name IS UNIQUE",
-        "CREATE CONSTRAINT city_name IF NOT EXISTS FOR (cy:City) REQUIRE cy.name IS UNIQUE",
-        "CREATE CONSTRAINT store_type IF NOT EXISTS FOR (s:Store) REQUIRE s.type IS UNIQUE",
-    ]
+    driver = GraphDatabase.driver(
+        NEO4J_URI,
+        auth=(NEO4J_USER, NEO4J_PASSWORD),
+        max_transaction_retry_time=INGEST_MAX_RETRY_TIME,
+    )
 
     with driver.session(database=NEO4J_DATABASE) as session:
-        # specific indexes
-        logger.info("Creating constraints and indexes...")
-        for q in query_constraints:
-            session.run(q)
-
-        logger.info("Ingesting data...")
-
-        # Process in batches
-        batch_size = 1000
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i : i + batch_size]
-            transaction_list = []
-
-            for index, row in batch.iterrows():
-                # Parse product list safely
-                try:
-                    product_list = ast.literal_eval(row["Product"])
-                except:
-                    product_list = []
-
-                transaction_data = {
-                    "id": str(row["Transaction_ID"]),
-                    "date": str(row["Date"]),
-                    "customer_name": row["Customer_Name"],
-                    "customer_category": row["Customer_Category"],
-                    "products": product_list,
-                    "total_items": int(row["Total_Items"]),
-                    "total_cost": float(row["Total_Cost"]),
-                    "payment_method": row["Payment_Method"],
-                    "city": row["City"],
-                    "store_type": row["Store_Type"],
-                    "discount_applied": bool(row["Discount_Applied"]),
-                    "season": row["Season"],
-                    "promotion": row["Promotion"],
-                }
-                transaction_list.append(transaction_data)
-
-            cypher_query = """
-            UNWIND $transactions AS row
-            
-            MERGE (c:Customer {name: row.customer_name})
-            ON CREATE SET c.category = row.customer_category
-            
-            MERGE (cy:City {name: row.city})
-            
-            MERGE (s:Store {type: row.store_type})
-            
-            MERGE (t:Transaction {id: row.id})
-            SET t.date = row.date,
-                t.total_items = row.total_items,
-                t.total_cost = row.total_cost,
-                t.payment_method = row.payment_method,
-                t.discount_applied = row.discount_applied,
-                t.season = row.season,
-                t.promotion = row.promotion
-
-            MERGE (c)-[:MADE]->(t)
-            MERGE (t)-[:AT]->(s)
-            MERGE (t)-[:IN_CITY]->(cy)
-            
-            FOREACH (prod_name IN row.products |
-                MERGE (p:Product {name: prod_name})
-                MERGE (t)-[:CONTAINS]->(p)
+        # Merges rely on the uniqueness constraints being online.
+        logger.info("Applying constraints and indexes...")
+        ensure_schema(session)
+
+        logger.info(f"Ingesting data with {workers} worker(s)...")
+
+        mark = HighWaterMark()
+        if incremental:
+            record = session.run(INGEST_STATE_QUERY).single()
+            mark = HighWaterMark(record["mark"] if record else None)
+            if mark.start is not None:
+                logger.info(f"Skipping transactions up to id {mark.start}")
+        dimensions = DimensionTracker(driver if incremental else None)
+
+        stats = IngestStats(estimate_total_rows(csv_path))
+        chunks = mark.filter(
+            stats.reading(read_chunks(csv_path, chunk_size, max_memory_mb, memory_map))
+        )
+        prepare = stats.timed("transform", prepare_stages)
+        # Row width and cost differ per stage, so each adapts on its own.
+        sizers = {
+            stage: BatchSizer(
+                min_size=min_batch_size, max_size=max_batch_size, fixed=batch_size
             )
-            """
+            for stage in STAGE_QUERIES
+        }
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ingest-writer"
+        ) as writers:
+            for stages in prepare_in_background(chunks, prepare):
+                for stage, rows in stages.items():
+                    rows = dimensions.new_rows(stage, rows)
+                    partitions = partition_rows(stage, rows, workers)
+                    futures = [
+                        writers.submit(
+                            write_stage, driver, stage, partition, stats, sizers[stage]
+                        )
+                        for partition in partitions
+                    ]
+                    for future in futures:
+                        future.result()
+                logger.info(stats.progress(len(stages["transactions"])))
 
-            session.run(cypher_query, transactions=transaction_list)
-            logger.info(f"Processed batch {i} to {i+batch_size}")
+        if mark.value is not None:
+            session.run(
+                INGEST_STATE_UPDATE,
+                mark=mark.value,
+                source=os.path.basename(csv_path),
+            )
+        if aggregates:
+            logger.info("Building aggregates...")
+            build_aggregates(session, stats)
+        # Bump the data version so agent-side caches stop serving old results;
+        # a run that wrote no rows (e.g. an incremental load with nothing new)
+        # leaves it, and every cached result, as it was.
+        if stats.rows:
+            session.run(DATA_VERSION_BUMP + (AGGREGATES_STAMP if aggregates else ""))
+        elif aggregates:
+            session.run(DATA_VERSION_MATCH + AGGREGATES_STAMP)
 
     driver.close()
-    logger.info("Ingestion complete.")
+    _invalidate_agent_caches()
+    summary = stats.summary()
+    summary["batch_sizes"] = {stage: sizer.size for stage, sizer in sizers.items()}
+    logger.info(f"Ingestion complete: {json.dumps(summary)}")
+    if stats_path:
+        with open(stats_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return summary
 
 
-if __name__ == "__main__":
-    import sys
+def _isoformat(value) -> str | None:
+    # neo4j-admin expects ISO 8601, with a "T" between date and time.
+    return value.isoformat() if value is not None else None
 
-    if len(sys.argv) > 1:
-        csv_file_path = sys.argv[1]
-    else:
-        # Default fallback
-        csv_file_path = "Retail_Transactions_Dataset.csv"
 
-    print(f"Ingesting data from: {csv_file_path}")
-    ingest_data(csv_file_path)
+def offline_rows(stages: dict[str, list]) -> dict[str, list[tuple]]:
+    """Turns staged rows into the data rows of each neo4j-admin import file."""
+    transactions = stages["transactions"]
+    return {
+        "customers": [(row["name"], row["category"]) for row in stages["customers"]],
+        "cities": [(name,) for name in stages["cities"]],
+        "stores": [(store_type,) for store_type in stages["stores"]],
+        "products": [(name,) for name in stages["products"]],
+        "transactions": [
+            (
+                row["id"],
+                _isoformat(row["datetime"]),
+                _isoformat(row["date"]),
+                row["year"],
+                row["month"],
+                row["week"],
+                row["total_items"],
+                row["total_cost"],
+                row["payment_method"],
+                "true" if row["discount_applied"] else "false",
+                row["season"],
+                row["promotion"],
+            )
+            for row in transactions
+        ],
+        "made": [(row["customer_name"], row["id"]) for row in stages["made"]],
+        "at": [(row["id"], row["store_type"]) for row in stages["at"]],
+        "in_city": [(row["id"], row["city"]) for row in stages["in_city"]],
+        "contains": [
+            (row["id"], name)
+            for row in stages["product_links"]
+            for name in row["products"]
+        ],
+    }
+
+
+def import_command(output_dir: str, database: str = NEO4J_DATABASE) -> list[str]:
+    """The neo4j-admin invocation that loads the files written by
+    export_offline into a new database."""
+
+    def files(stem):
+        prefix = os.path.join(output_dir, stem)
+        return f"{prefix}_header.csv,{prefix}.csv"
+
+    return [
+        "neo4j-admin",
+        "database",
+        "import",
+        "full",
+        # DimensionTracker's bounded memory may let a customer repeat.
+        "--skip-duplicate-nodes=true",
+        *(
+            f"--nodes={label}={files(stem)}"
+            for stem, (label, _) in OFFLINE_NODES.items()
+        ),
+        *(
+            f"--relationships={rel_type}={files(stem)}"
+            for stem, (rel_type, _) in OFFLINE_RELATIONSHIPS.items()
+        ),
+        database,
+    ]
+
+
+def _open_csv(output_dir: str, stem: str):
+    return open(
+        os.path.join(output_dir, f"{stem}.csv"), "w", newline="", encoding="utf-8"
+    )
+
+
+def export_offline(
+    csv_path,
+    output_dir,
+    chunk_size=INGEST_CHUNK_SIZE,
+    max_memory_mb=INGEST_MAX_MEMORY_MB,
+    memory_map=False,
+):
+    """Transforms the retail CSV (or a Parquet/Arrow copy) into neo4j-admin
+    import files.
+
+    Uses the same streaming reader and row preparation as `ingest_data`, so
+    memory stays bounded. Customers, cities, stores and products are written
+    once each while they fit in INGEST_MAX_TRACKED_KEYS, and the import skips
+    any repeats; transaction ids are assumed unique, as in the source export.
+    Returns the import command, which is also logged.
+    """
+    if not os.path.exists(csv_path):
+        logger.error(f"CSV file not found at {csv_path}")
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    tables = {**OFFLINE_NODES, **OFFLINE_RELATIONSHIPS}
+    for stem, (_, header) in tables.items():
+        with _open_csv(output_dir, f"{stem}_header") as f:
+            csv.writer(f).writerow(header)
+
+    logger.info(f"Exporting {csv_path} to {output_dir}...")
+    with contextlib.ExitStack() as files:
+        writers = {
+            stem: csv.writer(files.enter_context(_open_csv(output_dir, stem)))
+            for stem in tables
+        }
+        dimensions = DimensionTracker()
+        exported = 0
+        chunks = read_chunks(csv_path, chunk_size, max_memory_mb, memory_map)
+        for stages in prepare_in_background(chunks, prepare_stages):
+            stages = {
+                stage: dimensions.new_rows(stage, rows)
+                for stage, rows in stages.items()
+            }
+            for stem, rows in offline_rows(stages).items():
+                writers[stem].writerows(rows)
+            exported += len(stages["transactions"])
+            logger.info(f"Exported {exported} rows")
+
+    command = import_command(output_dir)
+    logger.info(
+        "Export complete. Stop the target database, then run:\n"
+        + " ".join(command)
+        + "\nThen start it and run `python app/neo4j_indexes.py --apply`."
+    )
+    return command
+
+
+def _rebuild_aggregate(tx, queries: list[str]) -> list:
+    return [tx.run(query).consume() for query in queries]
+
+
+def build_aggregates(session, stats: IngestStats | None = None) -> None:
+    """Materialises the AGGREGATE_QUERIES summaries after a load.
+
+    Each step's delete and rebuild share one write transaction.
+    """
+    for step, queries in AGGREGATE_QUERIES.items():
+        started = time.perf_counter()
+        summaries = session.execute_write(_rebuild_aggregate, queries)
+        if stats is not None:
+            seconds = (time.perf_counter() - started) / len(summaries)
+            for summary in summaries:
+                stats.record_batch(step, seconds, summary)
+        logger.info(f"Built aggregates: {step}")
+
+
+def _invalidate_agent_caches():
+    """Drops the agent's cached schema and data version when ingesting from
+    inside its process."""
+    if not __package__:
+        # Run as a script: no agent caches live in this process.
+        return
+    from app.data_version import forget_data_version
+    from app.graph_schema import invalidate_schema_cache
+
+    invalidate_schema_cache(NEO4J_DATABASE)
+    forget_data_version(NEO4J_DATABASE)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Load the retail transactions CSV into Neo4j."
+    )
+    parser.add_argument(
+        "csv_path", nargs="?", default="Retail_Transactions_Dataset.csv"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=INGEST_CHUNK_SIZE,
+        help="maximum rows parsed per chunk (env INGEST_CHUNK_SIZE)",
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=INGEST_MAX_MEMORY_MB,
+        help="memory ceiling for chunks in flight (env INGEST_MAX_MEMORY_MB)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INGEST_WORKERS,
+        help="concurrent writer sessions (env INGEST_WORKERS)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="skip transactions already loaded by earlier runs and merge only "
+        "new customers, cities, stores and products",
+    )
+    parser.add_argument(
+        "--offline-export",
+        metavar="DIR",
+        help="write neo4j-admin import files to DIR instead of loading into a "
+        "running database",
+    )
+    parser.add_argument(
+        "--memory-map",
+        action="store_true",
+        help="memory-map Parquet/Arrow input instead of reading it",
+    )
+    parser.add_argument(
+        "--convert",
+        metavar="OUTPUT",
+        help="convert the CSV to Parquet (.parquet) or Arrow IPC (.arrow) and "
+        "exit; later loads of OUTPUT skip CSV parsing",
+    )
+    parser.add_argument(
+        "--stats-json",
+        metavar="PATH",
+        help="write the ingestion summary (timings, rows/s, counters) to PATH",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="fixed rows per write transaction; disables adaptive sizing",
+    )
+    parser.add_argument(
+        "--min-batch-size",
+        type=int,
+        default=INGEST_MIN_BATCH_SIZE,
+        help="lower bound of the adaptive batch size (env INGEST_MIN_BATCH_SIZE)",
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=INGEST_MAX_BATCH_SIZE,
+        help="upper bound of the adaptive batch size (env INGEST_MAX_BATCH_SIZE)",
+    )
+    parser.add_argument(
+        "--aggregates",
+        action="store_true",
+        help="after loading, rebuild SalesSummary nodes, Product.purchase_count "
+        "and BOUGHT_WITH co-purchase counts",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if min(args.batch_size or 1, args.min_batch_size, args.max_batch_size) < 1:
+        parser.error("batch sizes must be at least 1")
+
+    if args.convert:
+        print(f"Converting {args.csv_path} to {args.convert}")
+        convert_csv(args.csv_path, args.convert, args.chunk_size, args.max_memory_mb)
+        return
+    if args.offline_export:
+        print(f"Exporting data from: {args.csv_path}")
+        export_offline(
+            args.csv_path,
+            args.offline_export,
+            args.chunk_size,
+            args.max_memory_mb,
+            args.memory_map,
+        )
+        return
+
+    print(f"Ingesting data from: {args.csv_path}")
+    ingest_data(
+        args.csv_path,
+        args.chunk_size,
+        args.max_memory_mb,
+        args.workers,
+        args.incremental,
+        args.memory_map,
+        args.stats_json,
+        args.batch_size,
+        args.min_batch_size,
+        args.max_batch_size,
+        args.aggregates,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ Instructions:
 4. Use the `save_html_dashboard` tool to save the generated HTML content.
 5. In your final response to the user, summarize the key findings and provide the path or link to the generated dashboard.
 
+Customer segmentation:
+- For recency/frequency/monetary (RFM), loyalty, churn-risk or "best customers" questions, call `get_customer_segments` instead of asking for multi-hop Cypher. Call it without arguments for the segment summary, then with a `segment` name to list that segment's top customers.
+
 Dashboard Requirements:
 - Use modern, clean HTML/CSS.
 - If using charts, use a library like Chart.js (embedding via CDN is acceptable) or simple HTML/CSS bar charts if external scripts are restricted.
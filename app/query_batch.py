@@ -0,0 +1,54 @@
+import json
+import os
+
+from app.query_control import error_payload
+from app.query_results import QUERY_MAX_BYTES, QUERY_MAX_ROWS
+
+# Most queries accepted by one run_cypher_queries call.
+QUERY_BATCH_MAX_QUERIES = int(os.getenv("QUERY_BATCH_MAX_QUERIES", "8"))
+# Extra seconds granted on top of the shared timeout for pool acquisition and
+# network round-trips before a still-pending query is reported as timed out.
+BATCH_DEADLINE_GRACE = float(os.getenv("BATCH_DEADLINE_GRACE", "2"))
+
+
+def batch_error(queries: list[str], names: list[str] | None) -> str | None:
+    """Returns a structured error if the batch cannot be run, else None."""
+    if not queries:
+        return error_payload("invalid_batch", "Pass at least one query.")
+    if len(queries) > QUERY_BATCH_MAX_QUERIES:
+        return error_payload(
+            "invalid_batch",
+            f"At most {QUERY_BATCH_MAX_QUERIES} queries can run in one batch; "
+            "split them or combine aggregates into fewer queries.",
+        )
+    if names and len(names) != len(queries):
+        return error_payload(
+            "invalid_batch",
+            f"Got {len(names)} names for {len(queries)} queries; pass one name "
+            "per query or omit names.",
+        )
+    if names and len(set(names)) != len(names):
+        return error_payload("invalid_batch", "Query names must be unique.")
+    return None
+
+
+def batch_names(queries: list[str], names: list[str] | None) -> list[str]:
+    """Uses the given names (validated by batch_error), else query_1..n."""
+    if names:
+        return [str(name) for name in names]
+    return [f"query_{i}" for i in range(1, len(queries) + 1)]
+
+
+def batch_budget(count: int) -> tuple[int, int]:
+    """Splits the single-query row/byte budget evenly across `count` queries."""
+    return max(1, QUERY_MAX_ROWS // count), max(1024, QUERY_MAX_BYTES // count)
+
+
+def render_batch(names: list[str], payloads: dict[str, str]) -> str:
+    """Joins per-query JSON payloads into one object keyed by name, in order.
+
+    Payloads are already serialized, so they are spliced in verbatim rather
+    than decoded and encoded again.
+    """
+    parts = [f"{json.dumps(name)}:{payloads[name]}" for name in names]
+    return "{" + ",".join(parts) + "}"
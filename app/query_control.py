@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+
+from neo4j.exceptions import Neo4jError
+
+from app.neo4j_driver import NEO4J_DATABASE, async_session
+
+logger = logging.getLogger(__name__)
+
+# Server-side transaction timeout for agent queries, and the most a caller may
+# ask for (seconds).
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "15"))
+QUERY_MAX_TIMEOUT = float(os.getenv("QUERY_MAX_TIMEOUT", "120"))
+# Tag placed in transaction metadata so this app's queries can be found in
+# SHOW TRANSACTIONS and terminated.
+APP_TAG = "retail-graph-analytics"
+
+_TERMINATE_QUERY = """
+SHOW TRANSACTIONS YIELD transactionId, metaData
+WHERE metaData.app = $app
+  AND ($invocation_id IS NULL OR metaData.invocation_id = $invocation_id)
+  AND ($query_ids IS NULL OR metaData.query_id IN $query_ids)
+RETURN collect(transactionId) AS ids
+"""
+
+
+def resolve_timeout(timeout_seconds: float | None) -> float:
+    """Clamps a caller-supplied timeout to (0, QUERY_MAX_TIMEOUT]."""
+    if not timeout_seconds or timeout_seconds <= 0:
+        return QUERY_TIMEOUT
+    return min(float(timeout_seconds), QUERY_MAX_TIMEOUT)
+
+
+def query_metadata(
+    invocation_id: str | None, query_id: str | None = None
+) -> dict[str, str]:
+    """Transaction metadata identifying the app, ADK invocation and, for
+    batch members, the individual query."""
+    metadata = {"app": APP_TAG}
+    if invocation_id:
+        metadata["invocation_id"] = invocation_id
+    if query_id:
+        metadata["query_id"] = query_id
+    return metadata
+
+
+async def cancel_queries_async(
+    invocation_id: str | None = None,
+    database: str = NEO4J_DATABASE,
+    query_ids: list[str] | None = None,
+) -> int:
+    """Terminates the running transactions of an invocation (or of the whole
+    app), optionally only those tagged with one of `query_ids`. Their clients then fail with Transaction.Terminated, which
+    classify_error reports as "cancelled". Returns the number terminated.
+
+    SHOW/TERMINATE TRANSACTIONS only see the server the session is routed
+    to. On a cluster this session is write-routed, so read transactions
+    running on secondaries are not found; they still stop at their
+    server-side timeout.
+    """
+    async with async_session(database=database) as neo4j_session:
+        result = await neo4j_session.run(
+            _TERMINATE_QUERY,
+            app=APP_TAG,
+            invocation_id=invocation_id,
+            query_ids=query_ids,
+        )
+        ids = (await result.single())["ids"]
+        if ids:
+            await (
+                await neo4j_session.run("TERMINATE TRANSACTIONS $ids", ids=ids)
+            ).consume()
+    logger.info(f"Terminated {len(ids)} transaction(s) for {invocation_id or APP_TAG}")
+    return len(ids)
+
+
+def error_payload(error: str, message: str, **details) -> str:
+    return json.dumps({"error": error, "message": message, **details})
+
+
+def timeout_error(timeout: float) -> str:
+    return error_payload(
+        "timeout",
+        f"Query timed out after {timeout:g}s. Add a LIMIT, aggregate earlier, "
+        "or anchor the MATCH on a specific node instead of scanning everything.",
+        timeout_seconds=timeout,
+    )
+
+
+def cancelled_error() -> str:
+    return error_payload(
+        "cancelled", "Query was cancelled because the request was abandoned."
+    )
+
+
+def classify_error(e: Exception, timeout: float) -> str:
+    """Maps a query failure to a structured error the agent can react to."""
+    code = e.code if isinstance(e, Neo4jError) else None
+    if code and "TransactionTimedOut" in code:
+        return timeout_error(timeout)
+    if code and code.endswith("Transaction.Terminated"):
+        return cancelled_error()
+    if code and code.endswith("Statement.AccessMode"):
+        return error_payload(
+            "read_only",
+            "The database only accepts read queries here. Remove CREATE, MERGE, "
+            "SET, DELETE and other write clauses.",
+        )
+    return error_payload("query_failed", f"Error executing query: {e}")
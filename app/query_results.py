@@ -0,0 +1,104 @@
+import json
+import os
+from typing import Any
+
+# Budgets for what run_cypher_query hands back to the LLM.
+QUERY_MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", "200"))
+QUERY_MAX_BYTES = int(os.getenv("QUERY_MAX_BYTES", "32000"))
+# After truncation, keep counting (without serializing) up to this many rows.
+QUERY_COUNT_CAP = int(os.getenv("QUERY_COUNT_CAP", "10000"))
+# "columnar" (columns + rows) or "records" (list of objects).
+QUERY_RESULT_FORMAT = os.getenv("QUERY_RESULT_FORMAT", "columnar")
+
+
+def _encode(value: Any) -> str:
+    # default=str covers neo4j.time values, whose str() is ISO 8601.
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ResultCollector:
+    """Accumulates result rows within row and byte budgets.
+
+    Rows are JSON-encoded as they arrive, so the byte budget is exact (UTF-8
+    bytes, not characters) and the final payload is assembled by joining
+    pre-encoded fragments.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = QUERY_MAX_ROWS,
+        max_bytes: int = QUERY_MAX_BYTES,
+        result_format: str = QUERY_RESULT_FORMAT,
+        count_cap: int = QUERY_COUNT_CAP,
+    ):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.result_format = result_format
+        self.count_cap = count_cap
+        self.columns: list[str] = []
+        self.rows: list[str] = []
+        self.bytes_used = 0
+        self.seen = 0
+        self.truncated = False
+        self.hints: list[str] = []
+
+    def add(self, data: dict[str, Any]) -> bool:
+        """Adds one record (as from `Record.data()`).
+
+        Returns False once more rows would not change the output, i.e. the
+        budgets are exhausted and the count cap has been reached.
+        """
+        self.seen += 1
+        if self.truncated:
+            return self.seen < self.count_cap
+        if not self.columns:
+            self.columns = list(data)
+        if self.result_format == "records":
+            encoded = _encode(data)
+        else:
+            encoded = _encode(list(data.values()))
+        # ensure_ascii=False keeps names readable, so count encoded bytes.
+        size = len(encoded.encode())
+        if len(self.rows) >= self.max_rows or self.bytes_used + size > self.max_bytes:
+            self.truncated = True
+            return self.seen < self.count_cap
+        self.rows.append(encoded)
+        self.bytes_used += size + 1
+        return True
+
+    def render(self, exhausted: bool = True) -> str:
+        """Renders the collected rows as compact JSON.
+
+        Args:
+            exhausted: Whether the whole result stream was read, which makes
+                the reported total row count exact.
+        """
+        body = ",".join(self.rows)
+        if self.result_format == "records":
+            parts = [f'{{"records":[{body}]']
+        else:
+            parts = [f'{{"columns":{_encode(self.columns)},"rows":[{body}]']
+        parts.append(f'"returned_rows":{len(self.rows)}')
+        if self.truncated:
+            parts.append('"truncated":true')
+            key = "total_rows" if exhausted else "total_rows_at_least"
+            parts.append(f'"{key}":{self.seen}')
+        if self.hints:
+            parts.append(f'"hints":{_encode(self.hints)}')
+        return ",".join(parts) + "}"
+
+
+async def collect_result_async(result, collector: ResultCollector | None = None) -> str:
+    """Streams a neo4j `AsyncResult` into a collector and renders it.
+
+    Cancellation arrives as asyncio.CancelledError, so no event is polled.
+    """
+    collector = collector or ResultCollector()
+    collector.columns = list(await result.keys())
+    exhausted = True
+    async for record in result:
+        if not collector.add(record.data()):
+            exhausted = False
+            break
+    await result.consume()
+    return collector.render(exhausted=exhausted)
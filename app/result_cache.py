@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from itertools import pairwise
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+# Upper bound on the summed size of cached payloads held in memory.
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Optional SQLite file that lets cached results survive process restarts.
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "")
+# Upper bound on the summed size of payloads kept in the SQLite file.
+RESULT_CACHE_MAX_DISK_BYTES = int(
+    os.getenv("RESULT_CACHE_MAX_DISK_BYTES", str(256 * 1024 * 1024))
+)
+
+# String literals and backtick-quoted identifiers
+_LITERAL = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`"""
+_LITERALS = re.compile(_LITERAL, re.DOTALL)
+_COMMENT = r"//[^\n]*|/\*.*?(?:\*/|$)"
+_TOKEN = re.compile(
+    _LITERAL + "|" + _COMMENT + r"|[A-Za-z_][A-Za-z0-9_]*|\s+|.", re.DOTALL
+)
+# Keywords and built-in functions are case-insensitive in Cypher; labels,
+# properties, variables and string literals are not.
+_KEYWORDS = frozenset(
+    """
+    match optional where return with order by limit skip asc desc ascending
+    descending as and or xor not distinct unwind call yield case when then else
+    end in is null true false union all starts ends contains exists
+    """.split()
+)
+_FUNCTIONS = frozenset(
+    """
+    count sum avg min max collect size coalesce tostring tointeger tofloat date
+    datetime duration round head last keys labels type exists all any none
+    """.split()
+)
+_WRITE_CLAUSE = re.compile(
+    r"\b(create|merge|delete|detach|set|remove|drop|load|foreach|call)\b"
+)
+# Functions whose result changes between calls: random values and the
+# current time (temporal constructors without arguments, or with only a
+# timezone, and their .realtime/.statement/.transaction variants).
+_TEMPORAL = r"(?:date|datetime|localdatetime|time|localtime)"
+_NONDETERMINISTIC = re.compile(
+    r"\b(?:rand|randomuuid|timestamp)\s*\("
+    rf"|(?<![.\w]){_TEMPORAL}\s*\(\s*(?:\{{\s*timezone\s*:[^,}}]*\}}\s*)?\)"
+    rf"|(?<![.\w]){_TEMPORAL}\.(?:realtime|statement|transaction)\b"
+)
+
+
+def _is_keyword(token: str, before: str, after: str, declared: set[str]) -> bool:
+    """Whether `token` is a keyword or function call rather than a property,
+    label, alias, parameter or map key that merely shares its spelling."""
+    lowered = token.lower()
+    if before in (".", ":", "$") or after == ":":
+        return False
+    if lowered in _FUNCTIONS and after == "(":
+        return True
+    return lowered in _KEYWORDS and before.lower() != "as" and token not in declared
+
+
+def strip_comments(query: str) -> str:
+    """Removes comments and trailing semicolons, keeping the rest verbatim."""
+    tokens = _TOKEN.findall(query)
+    text = "".join(" " if t.startswith(("//", "/*")) else t for t in tokens)
+    return re.sub(r"[\s;]+$", "", text).lstrip()
+
+
+def mask_literals(query: str) -> str:
+    """Replaces string literals and quoted names with '' so keyword searches
+    cannot match inside them."""
+    return _LITERALS.sub("''", query)
+
+
+def normalize_query(query: str) -> str:
+    """Canonicalizes whitespace and keyword case outside literals and drops
+    comments and trailing semicolons."""
+    tokens = [
+        " " if token.startswith(("//", "/*")) else token
+        for token in _TOKEN.findall(query)
+    ]
+    words = [(i, token) for i, token in enumerate(tokens) if not token.isspace()]
+    while words and words[-1][1] == ";":
+        words.pop()
+    # Names bound with AS keep their case wherever they are referenced.
+    declared = {
+        token for (_, prev), (_, token) in pairwise(words) if prev.lower() == "as"
+    }
+    parts = []
+    for n, (i, token) in enumerate(words):
+        if n and words[n - 1][0] != i - 1:
+            parts.append(" ")
+        before = words[n - 1][1] if n else ""
+        after = words[n + 1][1] if n + 1 < len(words) else ""
+        keyword = _is_keyword(token, before, after, declared)
+        parts.append(token.lower() if keyword else token)
+    return "".join(parts)
+
+
+def is_cacheable(normalized_query: str) -> bool:
+    """Only pure, deterministic reads are cached; anything that may write,
+    call out or depend on the clock or a random source is not."""
+    stripped = mask_literals(normalized_query).lower()
+    return not (_WRITE_CLAUSE.search(stripped) or _NONDETERMINISTIC.search(stripped))
+
+
+def cacheable_query(query: str, use_cache: bool = True) -> str | None:
+    """Returns the normalized query if its result may be cached, else None."""
+    if not (use_cache and RESULT_CACHE_ENABLED):
+        return None
+    normalized = normalize_query(query)
+    return normalized if is_cacheable(normalized) else None
+
+
+class ResultCache:
+    """Size-bounded LRU cache of serialized query results with a TTL.
+
+    When `path` is set, entries are also written to a SQLite file and read
+    back on memory misses, so the cache survives restarts.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESULT_CACHE_TTL,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        path: str = RESULT_CACHE_PATH,
+        max_disk_bytes: int = RESULT_CACHE_MAX_DISK_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._disk_bytes = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM results WHERE expires < ?", (time.time(),))
+            self._db.commit()
+            self._trim_disk()
+
+    @staticmethod
+    def make_key(
+        database: str, data_version: int, normalized_query: str, variant: str = ""
+    ) -> str:
+        """Builds a cache key; `variant` separates e.g. different row budgets."""
+        raw = f"{database}\0{data_version}\0{variant}\0{normalized_query}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._evict(key)
+            value = self._get_from_disk(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value[0], value[1])
+            return value[0]
+
+    def put(self, key: str, value: str) -> None:
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires)
+            if self._db is not None and len(value) <= self.max_disk_bytes:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    (key, value, expires),
+                )
+                self._db.commit()
+                self._disk_bytes += len(value)
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._trim_disk()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_tier": self._db is not None,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _store(self, key: str, value: str, expires: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (value, expires)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _trim_disk(self) -> None:
+        # The running total is only an estimate (replaced keys and other
+        # processes sharing the file are not tracked), so re-measure before
+        # deleting the entries that expire first, i.e. the oldest ones.
+        if self._db is None:
+            return
+        rows = self._db.execute(
+            "SELECT key, length(value) FROM results ORDER BY expires DESC"
+        ).fetchall()
+        kept, stale = 0, []
+        for key, size in rows:
+            if kept + size <= self.max_disk_bytes and not stale:
+                kept += size
+            else:
+                stale.append((key,))
+        if stale:
+            self._db.executemany("DELETE FROM results WHERE key = ?", stale)
+            self._db.commit()
+        self._disk_bytes = kept
+
+    def _get_from_disk(self, key: str) -> tuple[str, float] | None:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT value, expires FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0], row[1]
+
+
+result_cache = ResultCache()
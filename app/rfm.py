@@ -0,0 +1,206 @@
+import logging
+import os
+
+import numpy as np
+from neo4j import READ_ACCESS, unit_of_work
+
+from app.local_graph import DerivedCache
+from app.neo4j_driver import NEO4J_DATABASE, session
+from app.query_control import error_payload
+from app.query_results import ResultCollector
+
+logger = logging.getLogger(__name__)
+
+# Server-side timeout for reading the per-customer aggregates.
+RFM_BUILD_TIMEOUT = float(os.getenv("RFM_BUILD_TIMEOUT", "300"))
+# Number of quantile bins per score (5 gives the usual 1-5 RFM scores).
+RFM_BINS = int(os.getenv("RFM_BINS", "5"))
+RFM_MAX_K = int(os.getenv("RFM_MAX_K", "100"))
+
+# Dates travel as days since 1970-01-01 to keep the stream compact.
+_CUSTOMERS_QUERY = """
+MATCH (c:Customer)-[:MADE]->(t:Transaction)
+WITH c, max(t.date) AS last_date, count(t) AS frequency,
+     sum(t.total_cost) AS monetary
+WHERE last_date IS NOT NULL
+RETURN c.name AS customer,
+       duration.inDays(date('1970-01-01'), last_date).days AS last_day,
+       frequency, monetary
+"""
+
+# Checked in order; the first matching rule names the segment. `r`, `f` and
+# `m` are scores from 1 (worst) to RFM_BINS (best), scaled here to 0..1.
+SEGMENTS = [
+    ("Champions", lambda r, f, m: (r >= 0.75) & (f >= 0.75)),
+    ("Loyal", lambda r, f, m: (r >= 0.5) & (f >= 0.75)),
+    ("Potential Loyalists", lambda r, f, m: (r >= 0.75) & (f >= 0.25)),
+    ("New Customers", lambda r, f, m: r >= 0.75),
+    ("At Risk", lambda r, f, m: (r < 0.5) & ((f >= 0.5) | (m >= 0.75))),
+    ("Hibernating", lambda r, f, m: (r < 0.5) & (f < 0.5)),
+    ("Need Attention", lambda r, f, m: np.ones_like(r, dtype=bool)),
+]
+SEGMENT_NAMES = [name for name, _ in SEGMENTS]
+
+
+def quantile_scores(values: np.ndarray, bins: int = RFM_BINS) -> np.ndarray:
+    """Scores values 1..bins by quantile, higher values scoring higher.
+
+    Equal values always share a score, so heavily tied measures (such as
+    frequency) may not use every score.
+    """
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    edges = np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])
+    return 1 + np.searchsorted(edges, values, side="right")
+
+
+class RFMTable:
+    """Recency, frequency and monetary value per customer, with quantile
+    scores and a named segment for each."""
+
+    def __init__(
+        self,
+        customers: list[str],
+        last_day: np.ndarray,
+        frequency: np.ndarray,
+        monetary: np.ndarray,
+        bins: int = RFM_BINS,
+    ):
+        self.customers = list(customers)
+        self.frequency = np.asarray(frequency, dtype=np.int64)
+        self.monetary = np.asarray(monetary, dtype=np.float64)
+        last_day = np.asarray(last_day, dtype=np.int64)
+        # The data is historical, so recency counts back from its last day.
+        self.reference_day = int(last_day.max()) if len(last_day) else 0
+        self.recency = self.reference_day - last_day
+        self.r = quantile_scores(-self.recency, bins)
+        self.f = quantile_scores(self.frequency, bins)
+        self.m = quantile_scores(self.monetary, bins)
+
+        scale = max(bins - 1, 1)
+        r, f, m = ((score - 1) / scale for score in (self.r, self.f, self.m))
+        conditions = [rule(r, f, m) for _, rule in SEGMENTS]
+        self.segment = np.select(conditions, np.arange(len(SEGMENTS)), default=-1)
+
+    def summary(self) -> list[dict]:
+        """One row per non-empty segment, largest revenue first."""
+        groups = len(SEGMENTS)
+        customers = np.bincount(self.segment, minlength=groups)
+        revenue = np.bincount(self.segment, self.monetary, minlength=groups)
+        recency = np.bincount(self.segment, self.recency, minlength=groups)
+        orders = np.bincount(self.segment, self.frequency, minlength=groups)
+        total_customers = max(len(self.customers), 1)
+        total_revenue = revenue.sum() or 1.0
+        rows = []
+        for i in np.argsort(-revenue, kind="stable"):
+            if not customers[i]:
+                continue
+            rows.append(
+                {
+                    "segment": SEGMENT_NAMES[i],
+                    "customers": int(customers[i]),
+                    "customer_share": round(float(customers[i] / total_customers), 4),
+                    "revenue": round(float(revenue[i]), 2),
+                    "revenue_share": round(float(revenue[i] / total_revenue), 4),
+                    "avg_recency_days": round(float(recency[i] / customers[i]), 1),
+                    "avg_frequency": round(float(orders[i] / customers[i]), 2),
+                    "avg_monetary": round(float(revenue[i] / customers[i]), 2),
+                }
+            )
+        return rows
+
+    def top_customers(self, segment: str, k: int = 10) -> list[dict]:
+        """The highest-spending customers of `segment`."""
+        members = np.flatnonzero(self.segment == SEGMENT_NAMES.index(segment))
+        members = members[np.argsort(-self.monetary[members], kind="stable")[:k]]
+        return [
+            {
+                "customer": self.customers[i],
+                "recency_days": int(self.recency[i]),
+                "frequency": int(self.frequency[i]),
+                "monetary": round(float(self.monetary[i]), 2),
+                "rfm": f"{self.r[i]}{self.f[i]}{self.m[i]}",
+            }
+            for i in members
+        ]
+
+
+def _table_from_local(graph) -> RFMTable:
+    customer = graph.codes["customer"]
+    count = len(graph.labels["customer"])
+    has_customer = customer >= 0
+    frequency = np.bincount(customer[has_customer], minlength=count)
+    monetary = np.bincount(
+        customer[has_customer], graph.total_cost[has_customer], minlength=count
+    )
+    # Like max(t.date) in _CUSTOMERS_QUERY, only dated transactions count for
+    # recency, and customers without any are left out.
+    dated = has_customer & ~np.isnat(graph.dates)
+    last_day = np.full(count, np.iinfo(np.int64).min)
+    np.maximum.at(last_day, customer[dated], graph.dates[dated].astype(np.int64))
+    seen = np.flatnonzero(last_day > np.iinfo(np.int64).min)
+    return RFMTable(
+        [graph.labels["customer"][i] for i in seen],
+        last_day[seen],
+        frequency[seen],
+        monetary[seen],
+    )
+
+
+def _read_customers(tx) -> RFMTable:
+    names, last_day, frequency, monetary = [], [], [], []
+    for record in tx.run(_CUSTOMERS_QUERY):
+        names.append(record["customer"])
+        last_day.append(record["last_day"])
+        frequency.append(record["frequency"])
+        monetary.append(record["monetary"] or 0.0)
+    return RFMTable(names, np.array(last_day), np.array(frequency), np.array(monetary))
+
+
+def load_rfm_table(database: str = NEO4J_DATABASE) -> RFMTable:
+    """Reads per-customer aggregates from Neo4j in one streamed query."""
+    with session(database=database, default_access_mode=READ_ACCESS) as neo4j_session:
+        return neo4j_session.execute_read(
+            unit_of_work(timeout=RFM_BUILD_TIMEOUT)(_read_customers)
+        )
+
+
+def _build_table(graph, database: str) -> RFMTable:
+    if graph is not None:
+        table = _table_from_local(graph)
+    else:
+        table = load_rfm_table(database)
+    logger.info(f"Computed RFM scores for {len(table.customers)} customers")
+    return table
+
+
+_table_cache = DerivedCache(_build_table)
+
+
+def get_rfm_table(database: str = NEO4J_DATABASE) -> RFMTable:
+    """Returns the RFM table for the current data, computing it on first use.
+
+    Built from the in-process graph when LOCAL_GRAPH_PATH is loaded, else
+    from Neo4j; cached until the graph is reloaded or the data version moves.
+    """
+    return _table_cache.get(database)
+
+
+def rfm_payload(segment: str | None, top_k: int) -> str:
+    """Runs an RFM lookup and renders it like run_cypher_query."""
+    if segment is not None and segment not in SEGMENT_NAMES:
+        return error_payload(
+            "unknown_segment",
+            f"No segment named {segment!r}.",
+            segments=SEGMENT_NAMES,
+        )
+    table = get_rfm_table()
+    if segment is None:
+        rows = table.summary()
+    else:
+        rows = table.top_customers(segment, max(1, min(int(top_k), RFM_MAX_K)))
+    collector = ResultCollector()
+    collector.columns = list(rows[0]) if rows else []
+    for row in rows:
+        collector.add(row)
+    return collector.render()
@@ -0,0 +1,114 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks CSV-to-batch preparation for neo4j_ingest without a database.
+
+Compares the original per-row `iterrows` + `ast.literal_eval` loop with the
+vectorized `prepare_transactions`, on a CSV file or on synthetic rows:
+
+    make bench-ingest [CSV=PATH]
+    PYTHONPATH=. uv run python tests/benchmarks/bench_ingest_transform.py --rows N
+"""
+
+import argparse
+import ast
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.neo4j_ingest import prepare_transactions
+
+BATCH_SIZE = 1000
+PRODUCTS = ["Milk", "Bread", "Eggs", "Campbell's Soup", "Toothpaste", "Tea", "Rice"]
+
+
+def synthetic_rows(count: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    baskets = [
+        str(list(rng.choice(PRODUCTS, size=rng.integers(1, 6), replace=False)))
+        for _ in range(min(count, 5000))
+    ]
+    return pd.DataFrame(
+        {
+            "Transaction_ID": np.arange(1_000_000_000, 1_000_000_000 + count),
+            "Date": pd.Timestamp("2020-01-01")
+            + pd.to_timedelta(rng.integers(0, 1_500 * 86_400, count), unit="s"),
+            "Customer_Name": [f"Customer {i}" for i in rng.integers(0, 50_000, count)],
+            "Customer_Category": rng.choice(["Student", "Retiree", "Teenager"], count),
+            "Product": np.resize(baskets, count),
+            "Total_Items": rng.integers(1, 11, count),
+            "Total_Cost": rng.uniform(5, 100, count).round(2),
+            "Payment_Method": rng.choice(["Cash", "Credit Card"], count),
+            "City": rng.choice(["Boston", "Chicago", "Seattle"], count),
+            "Store_Type": rng.choice(["Pharmacy", "Supermarket"], count),
+            "Discount_Applied": rng.integers(0, 2, count).astype(bool),
+            "Season": rng.choice(["Winter", "Summer"], count),
+            "Promotion": rng.choice(["None", "Discount on Selected Items"], count),
+        }
+    )
+
+
+def iterrows_baseline(frame: pd.DataFrame) -> list[dict]:
+    """The per-row preparation loop neo4j_ingest used before vectorizing."""
+    transaction_list = []
+    for _, row in frame.iterrows():
+        try:
+            product_list = ast.literal_eval(row["Product"])
+        except Exception:
+            product_list = []
+        transaction_list.append(
+            {
+                "id": str(row["Transaction_ID"]),
+                "date": str(row["Date"]),
+                "customer_name": row["Customer_Name"],
+                "customer_category": row["Customer_Category"],
+                "products": product_list,
+                "total_items": int(row["Total_Items"]),
+                "total_cost": float(row["Total_Cost"]),
+                "payment_method": row["Payment_Method"],
+                "city": row["City"],
+                "store_type": row["Store_Type"],
+                "discount_applied": bool(row["Discount_Applied"]),
+                "season": row["Season"],
+                "promotion": row["Promotion"],
+            }
+        )
+    return transaction_list
+
+
+def rows_per_second(prepare, frame: pd.DataFrame) -> float:
+    started = time.perf_counter()
+    for i in range(0, len(frame), BATCH_SIZE):
+        prepare(frame.iloc[i : i + BATCH_SIZE])
+    return len(frame) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", help="CSV export to benchmark on")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    frame = pd.read_csv(args.csv) if args.csv else synthetic_rows(args.rows)
+    frame["Date"] = frame["Date"].astype(str)
+    baseline = rows_per_second(iterrows_baseline, frame)
+    vectorized = rows_per_second(prepare_transactions, frame)
+    print(f"rows:       {len(frame):,}")
+    print(f"iterrows:   {baseline:,.0f} rows/s")
+    print(f"vectorized: {vectorized:,.0f} rows/s ({vectorized / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import json
+
+from neo4j import READ_ACCESS
+from neo4j.exceptions import Neo4jError
+
+from app import async_tools
+
+
+class _AccessModeError(Neo4jError):
+    """What the server raises when a read transaction tries to write."""
+
+    @property
+    def code(self) -> str:
+        return "Neo.ClientError.Statement.AccessMode"
+
+
+# Stands in for the rows of a query that never finishes.
+_HANGS = object()
+
+
+class _Record:
+    def __init__(self, data: dict):
+        self._data = data
+
+    def data(self) -> dict:
+        return self._data
+
+
+class _Result:
+    def __init__(self, rows: list[dict]):
+        self._rows = rows
+
+    async def keys(self) -> list[str]:
+        return list(self._rows[0]) if self._rows else []
+
+    async def __aiter__(self):
+        for row in self._rows:
+            yield _Record(row)
+
+    async def consume(self) -> None:
+        return None
+
+
+class _Transaction:
+    def __init__(self, session: "_FakeSession"):
+        self.session = session
+
+    async def run(self, query: str, **parameters) -> _Result:
+        self.session.queries.append(query)
+        rows = self.session.results[query]
+        if isinstance(rows, Exception):
+            raise rows
+        if rows is _HANGS:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                self.session.cancelled.append(query)
+                raise
+        return _Result(rows)
+
+
+class _FakeSession:
+    """Records how the tools use a neo4j AsyncSession; only reads exist."""
+
+    def __init__(self, results: dict):
+        self.results = results
+        self.queries: list[str] = []
+        self.session_config: list[dict] = []
+        self.transactions: list[dict] = []
+        self.cancelled: list[str] = []
+
+    def __call__(self, **config) -> "_FakeSession":
+        self.session_config.append(config)
+        return self
+
+    async def __aenter__(self) -> "_FakeSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def execute_read(self, work, *args):
+        self.transactions.append({"timeout": work.timeout, "metadata": work.metadata})
+        return await work(_Transaction(self), *args)
+
+
+def _install(monkeypatch, results: dict) -> _FakeSession:
+    session = _FakeSession(results)
+    monkeypatch.setattr(async_tools, "async_session", session)
+    monkeypatch.setattr(async_tools, "should_review", lambda query: False)
+    return session
+
+
+def test_run_cypher_query_reads_in_a_managed_read_transaction(monkeypatch) -> None:
+    """Queries use READ_ACCESS sessions and execute_read with a timeout."""
+    query = "MATCH (c:City) RETURN c.name AS city"
+    session = _install(monkeypatch, {query: [{"city": "Boston"}]})
+    payload = json.loads(
+        asyncio.run(
+            async_tools.run_cypher_query(query, use_cache=False, timeout_seconds=5)
+        )
+    )
+    assert payload["rows"] == [["Boston"]]
+    assert session.session_config[0]["default_access_mode"] == READ_ACCESS
+    assert session.transactions[0]["timeout"] == 5
+    assert session.transactions[0]["metadata"]["app"] == "retail-graph-analytics"
+
+
+def test_run_cypher_query_reports_writes_as_read_only(monkeypatch) -> None:
+    """A write refused by the server comes back as a read_only error."""
+    query = "CREATE (c:City {name: 'Boston'})"
+    _install(monkeypatch, {query: _AccessModeError("writes not allowed")})
+    payload = json.loads(
+        asyncio.run(async_tools.run_cypher_query(query, use_cache=False))
+    )
+    assert payload["error"] == "read_only"
+
+
+def test_run_cypher_queries_terminates_only_late_members(monkeypatch) -> None:
+    """A member past the deadline is cancelled, reported and terminated by its
+    own id, while members that finished still return their rows."""
+    fast, slow = "MATCH (c:City) RETURN c.name AS city", "MATCH (t) RETURN t"
+    session = _install(monkeypatch, {fast: [{"city": "Boston"}], slow: _HANGS})
+    terminated = []
+
+    async def cancel_queries(invocation_id=None, query_ids=None):
+        terminated.append((invocation_id, query_ids))
+        return len(query_ids)
+
+    monkeypatch.setattr(async_tools, "cancel_queries_async", cancel_queries)
+    monkeypatch.setattr(async_tools, "BATCH_DEADLINE_GRACE", 0)
+    payload = json.loads(
+        asyncio.run(
+            async_tools.run_cypher_queries(
+                [fast, slow],
+                names=["cities", "everything"],
+                use_cache=False,
+                timeout_seconds=0.05,
+            )
+        )
+    )
+    assert payload["cities"]["rows"] == [["Boston"]]
+    assert payload["everything"]["error"] == "timeout"
+    assert session.cancelled == [slow]
+    query_ids = [tx["metadata"]["query_id"] for tx in session.transactions]
+    assert len(set(query_ids)) == 2
+    assert terminated == [(None, [query_ids[1]])]
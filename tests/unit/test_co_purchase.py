@@ -0,0 +1,87 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+
+import pytest
+
+from app import co_purchase
+from app.co_purchase import CoPurchaseIndex
+
+
+@pytest.fixture
+def index() -> CoPurchaseIndex:
+    return CoPurchaseIndex.from_baskets(
+        [
+            ["Milk", "Eggs"],
+            ["Milk", "Eggs", "Bread"],
+            ["Milk"],
+            ["Bread", "Tea"],
+            ["Milk", "Milk", "Eggs"],
+        ]
+    )
+
+
+def test_bought_with_reports_support_confidence_and_lift(index) -> None:
+    assert index.baskets == 5
+    assert index.bought_with("Milk", sort_by="count", min_count=1) == [
+        {
+            "product": "Eggs",
+            "count": 3,
+            "support": 0.6,
+            "confidence": 0.75,
+            "lift": 1.25,
+        },
+        {
+            "product": "Bread",
+            "count": 1,
+            "support": 0.2,
+            "confidence": 0.25,
+            "lift": 0.625,
+        },
+    ]
+    by_lift = index.bought_with("Bread", sort_by="lift", min_count=1)
+    assert [row["product"] for row in by_lift] == ["Tea", "Eggs", "Milk"]
+    assert index.bought_with("Tea") == []
+
+
+def test_top_pairs_respect_min_count(index) -> None:
+    assert index.top_pairs(sort_by="count", min_count=2) == [
+        {
+            "product_a": "Milk",
+            "product_b": "Eggs",
+            "count": 3,
+            "support": 0.6,
+            "confidence": 1.0,
+            "lift": 1.25,
+        }
+    ]
+    assert len(index.top_pairs(k=3, min_count=1)) == 3
+
+
+def test_payload_suggests_close_product_names(index, monkeypatch) -> None:
+    monkeypatch.setattr(co_purchase, "get_co_purchase_index", lambda: index)
+    error = json.loads(co_purchase.co_purchase_payload("Eggz", 5, "lift", 1))
+    assert error["error"] == "unknown_product"
+    assert "Eggs" in error["suggestions"]
+    payload = json.loads(co_purchase.co_purchase_payload("Eggs", 1, "count", 1))
+    assert payload["columns"] == [
+        "product",
+        "count",
+        "support",
+        "confidence",
+        "lift",
+    ]
+    assert payload["rows"] == [["Milk", 3, 0.6, 1.0, 1.25]]
@@ -0,0 +1,85 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from app.cypher_guard import review_plan
+
+
+def _plan(operator: str, rows: float, child_operator: str, child_rows: float) -> dict:
+    return {
+        "operatorType": f"{operator}@neo4j",
+        "args": {"EstimatedRows": rows},
+        "children": [
+            {
+                "operatorType": f"{child_operator}@neo4j",
+                "args": {"EstimatedRows": child_rows},
+                "children": [],
+            }
+        ],
+    }
+
+
+def test_hint_mode_reports_risky_operators_without_rewriting() -> None:
+    """Hint mode leaves the query alone and explains what is risky."""
+    query = "MATCH (n) RETURN n"
+    review = review_plan(query, _plan("ProduceResults", 1e6, "AllNodesScan", 1e6))
+    assert review.query == query
+    assert not review.rejected
+    assert any("scans every node" in hint for hint in review.hints)
+
+
+def test_limit_mode_injects_limit_into_unbounded_results() -> None:
+    """Unbounded results get a LIMIT; queries that already have one do not."""
+    plan = _plan("ProduceResults", 50_000, "NodeByLabelScan", 50_000)
+    review = review_plan(
+        "MATCH (t:Transaction) RETURN t.id;", plan, mode="limit", max_rows=100
+    )
+    assert review.query == "MATCH (t:Transaction) RETURN t.id\nLIMIT 100"
+
+    limited = "MATCH (t:Transaction) RETURN t.id LIMIT 10"
+    assert review_plan(limited, plan, mode="limit").query == limited
+
+
+def test_limit_mode_recognises_existing_limits_in_any_form() -> None:
+    """LIMIT expressions, trailing comments and semicolons count as bounded."""
+    plan = _plan("ProduceResults", 50_000, "NodeByLabelScan", 50_000)
+    for query in (
+        "MATCH (t:Transaction) RETURN t.id LIMIT toInteger($n)",
+        "MATCH (t:Transaction) RETURN t.id LIMIT 10; // first page",
+        "MATCH (t:Transaction) RETURN t.id LIMIT $n /* paged */",
+    ):
+        assert review_plan(query, plan, mode="limit").query == query
+
+
+def test_limit_mode_ignores_limits_that_do_not_end_the_query() -> None:
+    """A LIMIT in a subquery, a WITH or a literal does not bound the result."""
+    plan = _plan("ProduceResults", 50_000, "NodeByLabelScan", 50_000)
+    review = review_plan(
+        "MATCH (t:Transaction) WITH t LIMIT 5 MATCH (t)--(p) RETURN p; // all",
+        plan,
+        mode="limit",
+        max_rows=100,
+    )
+    assert review.query == (
+        "MATCH (t:Transaction) WITH t LIMIT 5 MATCH (t)--(p) RETURN p\nLIMIT 100"
+    )
+    query = "MATCH (t:Transaction {note: 'limit 5'}) RETURN t.id"
+    review = review_plan(query, plan, mode="limit", max_rows=100)
+    assert review.query == f"{query}\nLIMIT 100"
+
+
+def test_reject_mode_refuses_cartesian_products() -> None:
+    """Reject mode refuses plans containing a CartesianProduct."""
+    plan = _plan("ProduceResults", 10, "CartesianProduct", 10)
+    review = review_plan("MATCH (a:City), (b:Store) RETURN a, b", plan, mode="reject")
+    assert review.rejected
@@ -0,0 +1,194 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.graph_schema import SchemaCache, render_schema
+
+
+def test_schema_cache_serves_hits_until_invalidated() -> None:
+    """The loader runs once per database until the entry is invalidated."""
+    calls: list[str] = []
+
+    def loader(database: str) -> str:
+        calls.append(database)
+        return f"schema of {database}"
+
+    cache = SchemaCache(ttl=60)
+    assert cache.get("retail", loader) == "schema of retail"
+    assert cache.get("retail", loader) == "schema of retail"
+    assert calls == ["retail"]
+
+    cache.invalidate("retail")
+    cache.get("retail", loader)
+    assert calls == ["retail", "retail"]
+
+
+def test_schema_cache_reloads_when_the_data_version_changes() -> None:
+    """A newer data version misses even while the old entry is within its TTL."""
+    calls: list[str] = []
+
+    def loader(database: str) -> str:
+        calls.append(database)
+        return f"schema {len(calls)}"
+
+    cache = SchemaCache(ttl=60)
+    assert cache.get("retail", loader, data_version=1) == "schema 1"
+    assert cache.get("retail", loader, data_version=1) == "schema 1"
+    assert cache.get("retail", loader, data_version=2) == "schema 2"
+    assert calls == ["retail", "retail"]
+
+
+def test_schema_cache_refresh_is_single_flight() -> None:
+    """Concurrent misses share a single load."""
+    calls: list[str] = []
+
+    def slow_loader(database: str) -> str:
+        calls.append(database)
+        time.sleep(0.05)
+        return "schema"
+
+    cache = SchemaCache(ttl=60)
+    threads = [
+        threading.Thread(target=cache.get, args=("retail", slow_loader))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["retail"]
+
+
+def test_render_schema_lists_endpoints_and_typed_properties() -> None:
+    """Rendered text includes relationship endpoints and property types."""
+    schema = {
+        "nodes": {
+            "Customer": {
+                "name": {"types": ["String"], "mandatory": True},
+                "category": {"types": ["String"], "mandatory": False},
+            },
+            "Transaction": {"id": {"types": ["String"], "mandatory": True}},
+        },
+        "relationships": {"MADE": {}},
+        "endpoints": {("Customer", "MADE", "Transaction")},
+    }
+    text = render_schema(schema)
+    assert "Node Labels: Customer, Transaction" in text
+    assert "(:Customer)-[:MADE]->(:Transaction)" in text
+    assert "Properties for Customer: category (String, optional), name (String)" in text
+
+
+@pytest.mark.asyncio
+async def test_schema_cache_async_refresh_is_single_flight() -> None:
+    """Concurrent async misses share a single load."""
+    calls: list[str] = []
+
+    async def slow_loader(database: str) -> str:
+        calls.append(database)
+        await asyncio.sleep(0.05)
+        return "schema"
+
+    cache = SchemaCache(ttl=60)
+    results = await asyncio.gather(
+        *(cache.get_async("retail", slow_loader) for _ in range(8))
+    )
+    assert results == ["schema"] * 8
+    assert calls == ["retail"]
+
+
+def test_schema_cache_async_locks_are_per_event_loop() -> None:
+    """A second event loop contending for the same database gets its own lock."""
+
+    async def slow_loader(database: str) -> str:
+        await asyncio.sleep(0.01)
+        return "schema"
+
+    async def contend(cache: SchemaCache) -> list[str]:
+        return await asyncio.gather(
+            *(cache.get_async("retail", slow_loader) for _ in range(4))
+        )
+
+    cache = SchemaCache(ttl=0)
+    assert asyncio.run(contend(cache)) == ["schema"] * 4
+    assert asyncio.run(contend(cache)) == ["schema"] * 4
+
+
+def test_render_schema_describes_precomputed_aggregates() -> None:
+    """Aggregates from the post-ingest stage are called out when present."""
+    schema = {
+        "nodes": {
+            "Product": {"purchase_count": {"types": ["Long"], "mandatory": False}},
+            "SalesSummary": {"revenue": {"types": ["Double"], "mandatory": True}},
+        },
+        "relationships": {},
+        "endpoints": set(),
+        "aggregates_current": True,
+    }
+    text = render_schema(schema)
+    assert "Precomputed aggregates" in text
+    assert "  SalesSummary: one node per city" in text
+    assert "  Product.purchase_count:" in text
+    assert "BOUGHT_WITH" not in text
+
+    schema["nodes"] = {"Customer": {}}
+    assert "Precomputed aggregates" not in render_schema(schema)
+
+
+def test_render_schema_hides_stale_aggregates() -> None:
+    """Aggregates built from an older data version are left out entirely."""
+    schema = {
+        "nodes": {
+            "Product": {
+                "name": {"types": ["String"], "mandatory": True},
+                "purchase_count": {"types": ["Long"], "mandatory": False},
+            },
+            "SalesSummary": {"revenue": {"types": ["Double"], "mandatory": True}},
+        },
+        "relationships": {"BOUGHT_WITH": {}, "CONTAINS": {}},
+        "endpoints": {
+            ("Product", "BOUGHT_WITH", "Product"),
+            ("Transaction", "CONTAINS", "Product"),
+        },
+        "aggregates_current": False,
+    }
+    text = render_schema(schema)
+    assert "SalesSummary" not in text
+    assert "purchase_count" not in text
+    assert "BOUGHT_WITH" not in text
+    assert "Properties for Product: name (String)" in text
+    assert "(:Transaction)-[:CONTAINS]->(:Product)" in text
+    assert "purchase_count" in str(schema["nodes"]["Product"])
+
+
+def test_render_schema_marks_indexed_properties() -> None:
+    """Properties backed by an online index are flagged for the agent."""
+    schema = {
+        "nodes": {
+            "Transaction": {
+                "date": {"types": ["Date"], "mandatory": True},
+                "promotion": {"types": ["String"], "mandatory": False},
+            }
+        },
+        "relationships": {},
+        "endpoints": set(),
+        "indexed": {("Transaction", "date")},
+    }
+    text = render_schema(schema)
+    assert "date (Date, indexed)" in text
+    assert "promotion (String, optional)" in text
@@ -0,0 +1,166 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import gc
+import os
+import weakref
+
+import pandas as pd
+import pytest
+
+from app import local_graph
+from app.local_graph import DerivedCache, LocalGraph, aggregate_cypher, parse_aggregate
+
+
+@pytest.fixture(scope="module")
+def graph() -> LocalGraph:
+    return LocalGraph(
+        pd.DataFrame(
+            {
+                "Transaction_ID": ["1", "2", "3", "4"],
+                "Date": [
+                    "2023-01-02 10:00:00",
+                    "2023-01-09 11:00:00",
+                    "2023-03-01 12:00:00",
+                    "not a date",
+                ],
+                "Customer_Name": ["Alice", "Bob", "Alice", "Carol"],
+                "Customer_Category": [
+                    "Homemaker",
+                    "Professional",
+                    "Student",
+                    "Teacher",
+                ],
+                "Product": [
+                    "['Milk', 'Eggs']",
+                    "['Milk']",
+                    "['Tea', 'Milk', 'Milk']",
+                    "['Eggs']",
+                ],
+                "Total_Items": [2, 1, 3, 1],
+                "Total_Cost": [10.0, 20.0, 30.0, 5.0],
+                "Payment_Method": ["Cash", "Cash", "Debit Card", "Cash"],
+                "City": ["Los Angeles", "Chicago", "Chicago", None],
+                "Store_Type": ["Pharmacy", "Pharmacy", "Warehouse Club", "Pharmacy"],
+                "Season": ["Winter", "Winter", "Spring", "Summer"],
+            }
+        )
+    )
+
+
+def _run(graph: LocalGraph, metric: str, **kwargs) -> list[dict]:
+    return graph.aggregate(parse_aggregate(metric, **kwargs))
+
+
+def test_relationship_dimensions_drop_unlinked_transactions(graph) -> None:
+    assert _run(graph, "revenue") == [{"revenue": 65.0}]
+    assert _run(graph, "revenue", group_by=["city"]) == [
+        {"city": "Chicago", "revenue": 50.0},
+        {"city": "Los Angeles", "revenue": 10.0},
+    ]
+    # Customers keep the category they were first seen with.
+    assert _run(graph, "revenue", group_by=["customer_category"])[0] == {
+        "customer_category": "Homemaker",
+        "revenue": 40.0,
+    }
+
+
+def test_product_paths_count_each_product_once_per_basket(graph) -> None:
+    assert _run(graph, "transactions", group_by=["product"]) == [
+        {"product": "Milk", "transactions": 3},
+        {"product": "Eggs", "transactions": 2},
+        {"product": "Tea", "transactions": 1},
+    ]
+    assert _run(graph, "customers", group_by=["product"], limit=1) == [
+        {"product": "Milk", "customers": 2}
+    ]
+    assert _run(
+        graph, "transactions", group_by=["product"], filters=["customer=Alice"]
+    ) == [
+        {"product": "Milk", "transactions": 2},
+        {"product": "Eggs", "transactions": 1},
+        {"product": "Tea", "transactions": 1},
+    ]
+    assert _run(graph, "revenue", filters=["product=Tea"]) == [{"revenue": 30.0}]
+
+
+def test_dates_filter_and_group_with_nulls(graph) -> None:
+    assert _run(graph, "revenue", start_date="2023-01-05") == [{"revenue": 50.0}]
+    assert _run(graph, "revenue", group_by=["year"]) == [
+        {"year": 2023, "revenue": 60.0},
+        {"year": None, "revenue": 5.0},
+    ]
+    assert _run(graph, "avg_basket", filters=["season=Autumn"]) == [
+        {"avg_basket": None}
+    ]
+
+
+def test_parse_aggregate_rejects_unknown_arguments() -> None:
+    with pytest.raises(ValueError, match="Unknown metric"):
+        parse_aggregate("profit")
+    with pytest.raises(ValueError, match="Bad filter"):
+        parse_aggregate("revenue", filters=["region=West"])
+    with pytest.raises(ValueError, match="whole number"):
+        parse_aggregate("revenue", filters=["year=last"])
+
+
+def test_aggregate_cypher_matches_only_the_needed_paths() -> None:
+    query = parse_aggregate(
+        "revenue",
+        group_by=["city"],
+        filters=["product=Campbell's Soup", "year=2023"],
+        end_date="2023-12-31",
+        limit=5,
+    )
+    assert aggregate_cypher(query) == (
+        "MATCH (t:Transaction)\n"
+        "MATCH (t)-[:IN_CITY]->(cy:City)\n"
+        "WHERE EXISTS { MATCH (t)-[:CONTAINS]->(p:Product) WHERE p.name IN "
+        '["Campbell\'s Soup"] }\n'
+        "  AND t.year IN [2023]\n"
+        '  AND t.date <= date("2023-12-31")\n'
+        "RETURN cy.name AS city, sum(t.total_cost) AS revenue\n"
+        "ORDER BY revenue DESC\n"
+        "LIMIT 5"
+    )
+
+
+def test_derived_cache_rebuilds_on_reload_without_pinning_old_graphs(
+    tmp_path, monkeypatch
+) -> None:
+    """Values follow the file's mtime, and a replaced graph can be freed."""
+
+    class _Graph:
+        size = 0
+
+    path = tmp_path / "retail.csv"
+    path.write_text("")
+    monkeypatch.setattr(local_graph, "_loaded", None)
+    monkeypatch.setattr(LocalGraph, "load", classmethod(lambda cls, path: _Graph()))
+    builds = []
+
+    def build(graph, database):
+        builds.append(database)
+        return len(builds)
+
+    cache = DerivedCache(build)
+    assert cache.get("retail", path=str(path)) == 1
+    assert cache.get("retail", path=str(path)) == 1
+    first = weakref.ref(local_graph.get_local_graph(str(path)))
+
+    os.utime(path, (0, 12345))
+    assert cache.get("retail", path=str(path)) == 2
+    gc.collect()
+    assert first() is None
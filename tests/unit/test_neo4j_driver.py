@@ -0,0 +1,33 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+from app import neo4j_driver
+
+
+def test_close_drivers_closes_async_drivers_on_their_loop() -> None:
+    """Shutdown closes async pools too, on the loop that created them."""
+
+    async def create():
+        return neo4j_driver.get_async_driver("bolt://127.0.0.1:1")
+
+    loop = asyncio.new_event_loop()
+    try:
+        driver = loop.run_until_complete(create())
+        neo4j_driver.close_drivers()
+        assert driver._closed
+        assert neo4j_driver.pool_metrics()["open_drivers"] == 0
+    finally:
+        loop.close()
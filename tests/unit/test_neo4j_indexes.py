@@ -0,0 +1,133 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from app.neo4j_indexes import (
+    DESIRED_SCHEMA,
+    SchemaItem,
+    detect_drift,
+    has_drift,
+    read_live_schema,
+)
+
+
+class _FakeSession:
+    def __init__(self, indexes: list[dict], constraints: list[dict]):
+        self.indexes = indexes
+        self.constraints = constraints
+
+    def run(self, query: str) -> list[dict]:
+        return self.constraints if "CONSTRAINTS" in query else self.indexes
+
+
+def _index(name, type_, labels, props, state="ONLINE", owner=None) -> dict:
+    return {
+        "name": name,
+        "type": type_,
+        "labelsOrTypes": labels,
+        "properties": props,
+        "state": state,
+        "populationPercent": 100.0 if state == "ONLINE" else 40.0,
+        "owningConstraint": owner,
+    }
+
+
+def test_create_statements_cover_every_kind() -> None:
+    statements: dict[str, str] = {}
+    for item in DESIRED_SCHEMA:
+        statements.setdefault(item.kind, item.create_statement())
+    assert statements["unique"].startswith("CREATE CONSTRAINT transaction_id ")
+    assert statements["unique"].endswith("REQUIRE (n.id) IS UNIQUE")
+    assert "FULLTEXT INDEX" in statements["fulltext"]
+    assert "ON EACH [n.name]" in statements["fulltext"]
+    assert statements["text"].startswith("CREATE TEXT INDEX")
+    names = [item.name for item in DESIRED_SCHEMA]
+    assert len(names) == len(set(names))
+
+
+def test_read_live_schema_folds_backing_indexes_into_constraints() -> None:
+    session = _FakeSession(
+        indexes=[
+            _index("index_lookup", "LOOKUP", None, None),
+            _index(
+                "transaction_id",
+                "RANGE",
+                ["Transaction"],
+                ["id"],
+                owner="transaction_id",
+            ),
+            _index(
+                "transaction_week", "RANGE", ["Transaction"], ["week"], "POPULATING"
+            ),
+        ],
+        constraints=[
+            {
+                "name": "transaction_id",
+                "type": "NODE_PROPERTY_UNIQUENESS",
+                "labelsOrTypes": ["Transaction"],
+                "properties": ["id"],
+            }
+        ],
+    )
+    live = read_live_schema(session)
+    assert set(live) == {"transaction_id", "transaction_week"}
+    assert live["transaction_id"]["kind"] == "unique"
+    assert live["transaction_week"]["state"] == "POPULATING"
+
+
+def test_detect_drift_reports_missing_changed_extra_and_not_online() -> None:
+    desired = [
+        SchemaItem("transaction_id", "unique", "Transaction", ["id"]),
+        SchemaItem("transaction_week", "range", "Transaction", ["week"]),
+        SchemaItem("transaction_season", "range", "Transaction", ["season"]),
+        SchemaItem("product_name_text", "text", "Product", ["name"]),
+    ]
+    live = {
+        "transaction_id": {
+            "kind": "unique",
+            "label": "Transaction",
+            "properties": ["id"],
+            "state": "ONLINE",
+        },
+        "transaction_week": {
+            "kind": "range",
+            "label": "Transaction",
+            "properties": ["year"],
+            "state": "POPULATING",
+        },
+        # Same definition under another name satisfies the declaration.
+        "legacy_season": {
+            "kind": "range",
+            "label": "Transaction",
+            "properties": ["season"],
+            "state": "ONLINE",
+        },
+        "adhoc": {
+            "kind": "range",
+            "label": "Customer",
+            "properties": ["category"],
+            "state": "ONLINE",
+        },
+    }
+    drift = detect_drift(desired, live)
+    assert drift == {
+        "missing": ["product_name_text"],
+        "changed": ["transaction_week"],
+        "extra": ["adhoc"],
+        "not_online": {"transaction_week": "POPULATING"},
+    }
+    assert has_drift(drift)
+    assert not has_drift(
+        detect_drift(desired[:1], {"transaction_id": live["transaction_id"]})
+    )
@@ -0,0 +1,321 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from app.neo4j_ingest import (
+    AGGREGATE_QUERIES,
+    BatchSizer,
+    DimensionTracker,
+    HighWaterMark,
+    IngestStats,
+    build_aggregates,
+    convert_csv,
+    estimate_total_rows,
+    export_offline,
+    parse_product_lists,
+    partition_rows,
+    prepare_in_background,
+    prepare_transactions,
+    read_chunks,
+    read_csv_chunks,
+    stage_rows,
+)
+
+
+def _raw_rows() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Transaction_ID": [1000000001, 1000000002],
+            "Date": ["2022-01-21 06:27:29", "2023-03-01 13:01:21"],
+            "Customer_Name": ["Stacey Price", "Michelle Carlson"],
+            "Customer_Category": ["Homemaker", "Professional"],
+            "Product": ["['Ketchup', 'Shaving Cream']", "['Tea']"],
+            "Total_Items": [3, 2],
+            "Total_Cost": [71.65, 25.93],
+            "Payment_Method": ["Mobile Payment", "Cash"],
+            "City": ["Los Angeles", "San Francisco"],
+            "Store_Type": ["Warehouse Club", "Convenience Store"],
+            "Discount_Applied": [True, False],
+            "Season": ["Winter", "Spring"],
+            "Promotion": [None, "BOGO (Buy One Get One)"],
+        }
+    )
+
+
+def test_parse_product_lists_handles_quotes_and_bad_cells() -> None:
+    parsed = parse_product_lists(
+        pd.Series(["['Milk', 'Eggs']", "[\"Campbell's Soup\", 'Tea']", "[]", None])
+    )
+    assert parsed.tolist() == [
+        ["Milk", "Eggs"],
+        ["Campbell's Soup", "Tea"],
+        [],
+        [],
+    ]
+    already_parsed = pd.Series([["Milk"], None], dtype=object)
+    assert parse_product_lists(already_parsed).tolist() == [["Milk"], []]
+
+
+def test_prepare_transactions_builds_native_records() -> None:
+    rows = prepare_transactions(_raw_rows())
+    assert rows[0] == {
+        "id": "1000000001",
+        "datetime": datetime.datetime(2022, 1, 21, 6, 27, 29),
+        "date": datetime.date(2022, 1, 21),
+        "year": 2022,
+        "month": 1,
+        "week": 3,
+        "customer_name": "Stacey Price",
+        "customer_category": "Homemaker",
+        "products": ["Ketchup", "Shaving Cream"],
+        "total_items": 3,
+        "total_cost": 71.65,
+        "payment_method": "Mobile Payment",
+        "city": "Los Angeles",
+        "store_type": "Warehouse Club",
+        "discount_applied": True,
+        "season": "Winter",
+        "promotion": None,
+    }
+    assert type(rows[1]["total_items"]) is int
+    assert rows[1]["discount_applied"] is False
+
+
+def test_unparseable_dates_become_null_properties() -> None:
+    raw = _raw_rows()
+    raw.loc[1, "Date"] = "not a date"
+    row = prepare_transactions(raw)[1]
+    assert {key: row[key] for key in ("datetime", "date", "year", "week")} == {
+        "datetime": None,
+        "date": None,
+        "year": None,
+        "week": None,
+    }
+
+
+def test_stage_rows_dedupes_dimensions_before_transactions() -> None:
+    rows = prepare_transactions(pd.concat([_raw_rows()] * 3, ignore_index=True))
+    stages = stage_rows(rows)
+    assert list(stages)[:5] == [
+        "customers",
+        "cities",
+        "stores",
+        "products",
+        "transactions",
+    ]
+    assert stages["customers"] == [
+        {"name": "Michelle Carlson", "category": "Professional"},
+        {"name": "Stacey Price", "category": "Homemaker"},
+    ]
+    assert stages["products"] == ["Ketchup", "Shaving Cream", "Tea"]
+    assert len(stages["transactions"]) == len(stages["made"]) == 6
+    assert stages["made"][0] == {"id": "1000000001", "customer_name": "Stacey Price"}
+    assert stages["at"][0] == {"id": "1000000001", "store_type": "Warehouse Club"}
+    assert stages["in_city"][0] == {"id": "1000000001", "city": "Los Angeles"}
+
+
+def test_missing_dimension_only_drops_its_own_link() -> None:
+    raw = _raw_rows()
+    raw.loc[0, "City"] = None
+    stages = stage_rows(prepare_transactions(raw))
+    assert [row["id"] for row in stages["in_city"]] == ["1000000002"]
+    assert [row["id"] for row in stages["made"]] == ["1000000001", "1000000002"]
+    assert [row["id"] for row in stages["at"]] == ["1000000001", "1000000002"]
+
+
+def test_partition_rows_keeps_each_transaction_in_one_worker() -> None:
+    rows = [{"id": str(i)} for i in range(100)]
+    first = partition_rows("made", rows, 4)
+    again = partition_rows("product_links", list(reversed(rows)), 4)
+    assert sorted(len(part) for part in first) == sorted(len(part) for part in again)
+    assert [{row["id"] for row in part} for part in first] == [
+        {row["id"] for row in part} for part in again
+    ]
+
+    cities = ["Atlanta", "Boston", "Chicago", "Dallas", "Houston"]
+    assert partition_rows("cities", cities, 2) == [cities[:3], cities[3:]]
+    assert partition_rows("cities", [], 2) == []
+
+
+def test_streamed_chunks_respect_memory_ceiling(tmp_path) -> None:
+    csv_path = tmp_path / "transactions.csv"
+    raw = pd.concat([_raw_rows()] * 2000, ignore_index=True)
+    raw["Extra_Column"] = "not ingested"
+    raw.to_csv(csv_path, index=False)
+
+    chunks = list(read_csv_chunks(str(csv_path), chunk_size=3000, max_memory_mb=1))
+    assert sum(len(chunk) for chunk in chunks) == len(raw)
+    assert "Extra_Column" not in chunks[0].columns
+    assert max(len(chunk) for chunk in chunks[1:]) < 3000
+
+    prepared = list(prepare_in_background(iter(chunks)))
+    assert sum(len(rows) for rows in prepared) == len(raw)
+    assert prepared[0][1]["promotion"] == "BOGO (Buy One Get One)"
+
+
+def test_high_water_mark_skips_loaded_rows_and_tracks_the_max() -> None:
+    chunks = [_raw_rows(), _raw_rows().assign(Transaction_ID=[1000000003, "x"])]
+    mark = HighWaterMark(1000000001)
+    fresh = list(mark.filter(iter(chunks)))
+    assert [row for chunk in fresh for row in chunk["Transaction_ID"]] == [
+        1000000002,
+        1000000003,
+        "x",
+    ]
+    assert mark.value == 1000000003
+
+
+def test_dimension_tracker_merges_each_key_once_per_run() -> None:
+    tracker = DimensionTracker()
+    customers = [{"name": "Stacey Price", "category": "Homemaker"}]
+    assert tracker.new_rows("customers", customers) == customers
+    assert tracker.new_rows("customers", customers) == []
+    assert tracker.new_rows("cities", ["Boston", "Chicago"]) == ["Boston", "Chicago"]
+    assert tracker.new_rows("cities", ["Chicago", "Dallas"]) == ["Dallas"]
+    assert tracker.new_rows("transactions", [{"id": "1"}]) == [{"id": "1"}]
+
+
+def test_dimension_tracker_memory_is_bounded() -> None:
+    tracker = DimensionTracker(max_keys=2)
+    assert tracker.new_rows("cities", ["Atlanta", "Boston"]) == ["Atlanta", "Boston"]
+    assert tracker.new_rows("cities", ["Atlanta", "Chicago"]) == ["Chicago"]
+    assert list(tracker.known["cities"]) == ["Atlanta", "Chicago"]
+    # Boston was the least recently seen, so it is merged again.
+    assert tracker.new_rows("cities", ["Boston"]) == ["Boston"]
+
+
+def test_offline_export_writes_deduped_admin_import_files(tmp_path) -> None:
+    csv_path = tmp_path / "transactions.csv"
+    pd.concat([_raw_rows()] * 3, ignore_index=True).to_csv(csv_path, index=False)
+    out = tmp_path / "import"
+
+    command = export_offline(str(csv_path), str(out), chunk_size=2)
+
+    assert (out / "customers_header.csv").read_text().strip() == (
+        "name:ID(Customer),category"
+    )
+    customers = (out / "customers.csv").read_text().splitlines()
+    assert sorted(customers) == [
+        "Michelle Carlson,Professional",
+        "Stacey Price,Homemaker",
+    ]
+    transactions = (out / "transactions.csv").read_text().splitlines()
+    assert transactions[0] == (
+        "1000000001,2022-01-21T06:27:29,2022-01-21,2022,1,3,"
+        "3,71.65,Mobile Payment,true,Winter,"
+    )
+    assert len((out / "contains.csv").read_text().splitlines()) == 9
+    assert f"--nodes=Customer={out}/customers_header.csv,{out}/customers.csv" in command
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_converted_columnar_input_matches_csv(tmp_path, suffix) -> None:
+    pytest.importorskip("pyarrow")
+    csv_path = tmp_path / "transactions.csv"
+    _raw_rows().to_csv(csv_path, index=False)
+    columnar_path = str(tmp_path / f"transactions{suffix}")
+
+    assert convert_csv(str(csv_path), columnar_path) == 2
+    from_csv = prepare_transactions(next(read_chunks(str(csv_path))))
+    from_columnar = prepare_transactions(
+        next(read_chunks(columnar_path, memory_map=True))
+    )
+    assert from_columnar == from_csv
+
+
+def test_ingest_stats_summarizes_timings_and_counters(tmp_path) -> None:
+    csv_path = tmp_path / "transactions.csv"
+    pd.concat([_raw_rows()] * 50, ignore_index=True).to_csv(csv_path, index=False)
+    assert estimate_total_rows(str(csv_path)) == 100
+
+    stats = IngestStats(total_rows=100)
+    chunks = list(stats.reading(read_csv_chunks(str(csv_path), chunk_size=40)))
+    prepare = stats.timed("transform", prepare_transactions)
+    prepare(chunks[0])
+    summary = SimpleNamespace(
+        result_available_after=5,
+        result_consumed_after=15,
+        counters=SimpleNamespace(
+            nodes_created=40,
+            relationships_created=80,
+            properties_set=320,
+            labels_added=40,
+        ),
+    )
+    stats.record_batch("transactions", 0.05, summary)
+    assert "ETA" in stats.progress(40)
+
+    result = stats.summary()
+    assert result["rows"] == 40
+    assert result["rows_scanned"] == 100
+    assert result["batches"] == 1
+    assert result["seconds"]["server"] == 0.02
+    assert result["seconds"]["network_and_commit"] == 0.03
+    assert set(result["seconds"]) >= {"parse", "transform", "write"}
+    assert result["counters"]["relationships_created"] == 80
+
+
+def test_batch_sizer_follows_commit_latency_within_bounds() -> None:
+    sizer = BatchSizer(
+        initial=1000,
+        min_size=500,
+        max_size=2000,
+        target_seconds=1.0,
+        memory_share=lambda: 0.5,
+    )
+    sizer.observe(1000, 0.1)
+    assert sizer.size == 1500
+    sizer.observe(1500, 0.1)
+    assert sizer.size == 2000
+    sizer.observe(2000, 1.6)
+    assert sizer.size == 1250
+    sizer.observe(1250, 10.0)
+    assert sizer.size == 625
+    sizer.observe(625, 10.0)
+    assert sizer.size == 500
+
+
+def test_batch_sizer_shrinks_under_memory_pressure_and_honours_fixed() -> None:
+    sizer = BatchSizer(initial=4000, min_size=500, memory_share=lambda: 0.05)
+    sizer.observe(4000, 0.1)
+    assert sizer.size == 2000
+
+    fixed = BatchSizer(fixed=750)
+    fixed.observe(750, 30.0)
+    assert fixed.size == 750
+
+
+def test_build_aggregates_rebuilds_each_step_in_one_transaction() -> None:
+    transactions: list[list[str]] = []
+
+    class FakeTx:
+        def __init__(self):
+            self.queries: list[str] = []
+            transactions.append(self.queries)
+
+        def run(self, query):
+            self.queries.append(query)
+            return SimpleNamespace(consume=lambda: None)
+
+    class FakeSession:
+        def execute_write(self, work, *args):
+            return work(FakeTx(), *args)
+
+    build_aggregates(FakeSession())
+    assert transactions == list(AGGREGATE_QUERIES.values())
@@ -0,0 +1,47 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from app.query_batch import batch_budget, batch_error, batch_names, render_batch
+from app.query_results import QUERY_MAX_ROWS
+
+
+def test_batch_names_fall_back_when_missing() -> None:
+    queries = ["RETURN 1", "RETURN 2"]
+    assert batch_names(queries, ["kpis", "trend"]) == ["kpis", "trend"]
+    assert batch_names(queries, None) == ["query_1", "query_2"]
+    assert batch_names(queries, []) == ["query_1", "query_2"]
+
+
+def test_batch_error_rejects_empty_mismatched_and_duplicate_names() -> None:
+    assert json.loads(batch_error([], None))["error"] == "invalid_batch"
+    assert json.loads(batch_error(["RETURN 1"] * 2, ["a", "a"]))["error"] == (
+        "invalid_batch"
+    )
+    assert json.loads(batch_error(["RETURN 1"] * 2, ["only_one"]))["error"] == (
+        "invalid_batch"
+    )
+    assert batch_error(["RETURN 1"], None) is None
+
+
+def test_budget_is_split_and_results_keyed_by_name() -> None:
+    rows, _ = batch_budget(4)
+    assert rows == QUERY_MAX_ROWS // 4
+
+    rendered = render_batch(
+        ["b", "a"], {"a": '{"columns":["x"],"rows":[[1]]}', "b": '{"error":"x"}'}
+    )
+    assert list(json.loads(rendered)) == ["b", "a"]
+    assert json.loads(rendered)["a"]["rows"] == [[1]]
@@ -0,0 +1,59 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+
+from neo4j.exceptions import Neo4jError
+
+from app import query_control
+from app.query_control import classify_error, resolve_timeout
+
+
+class _ServerError(Neo4jError):
+    """A Neo4jError with a given status code, as the driver would raise it."""
+
+    def __init__(self, status_code: str):
+        super().__init__("server message")
+        self.status_code = status_code
+
+    @property
+    def code(self) -> str:
+        return self.status_code
+
+
+def test_classify_error_maps_server_codes() -> None:
+    """Timeouts, terminations and write attempts get their own error kinds."""
+    cases = {
+        "Neo.ClientError.Transaction.TransactionTimedOutClientConfiguration": "timeout",
+        "Neo.TransientError.Transaction.Terminated": "cancelled",
+        "Neo.ClientError.Statement.AccessMode": "read_only",
+        "Neo.ClientError.Statement.SyntaxError": "query_failed",
+    }
+    for code, kind in cases.items():
+        assert json.loads(classify_error(_ServerError(code), 5))["error"] == kind, code
+    timeout = json.loads(classify_error(_ServerError(next(iter(cases))), 7.5))
+    assert timeout["timeout_seconds"] == 7.5
+    assert json.loads(classify_error(ValueError("boom"), 5))["error"] == "query_failed"
+
+
+def test_resolve_timeout_clamps_to_the_allowed_range(monkeypatch) -> None:
+    """Missing or non-positive timeouts use the default; large ones are capped."""
+    monkeypatch.setattr(query_control, "QUERY_TIMEOUT", 15.0)
+    monkeypatch.setattr(query_control, "QUERY_MAX_TIMEOUT", 120.0)
+    assert resolve_timeout(None) == 15.0
+    assert resolve_timeout(0) == 15.0
+    assert resolve_timeout(-3) == 15.0
+    assert resolve_timeout(30) == 30.0
+    assert resolve_timeout(600) == 120.0
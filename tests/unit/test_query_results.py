@@ -0,0 +1,63 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from app.query_results import ResultCollector
+
+
+def test_collector_renders_columnar_json() -> None:
+    """Rows are emitted as compact columns + rows JSON."""
+    collector = ResultCollector(max_rows=10, max_bytes=1000)
+    collector.add({"city": "Boston", "revenue": 12.5})
+    collector.add({"city": "Chicago", "revenue": 7.0})
+    payload = json.loads(collector.render())
+    assert payload == {
+        "columns": ["city", "revenue"],
+        "rows": [["Boston", 12.5], ["Chicago", 7.0]],
+        "returned_rows": 2,
+    }
+
+
+def test_collector_truncates_on_row_budget_and_keeps_counting() -> None:
+    """Rows beyond the budget are counted but not serialized."""
+    collector = ResultCollector(max_rows=2, max_bytes=1000, count_cap=100)
+    for i in range(5):
+        assert collector.add({"n": i})
+    payload = json.loads(collector.render())
+    assert payload["rows"] == [[0], [1]]
+    assert payload["truncated"] is True
+    assert payload["total_rows"] == 5
+
+
+def test_collector_stops_at_byte_budget_and_count_cap() -> None:
+    """The byte budget truncates, and the count cap ends the stream."""
+    collector = ResultCollector(max_rows=100, max_bytes=20, count_cap=3)
+    assert collector.add({"name": "x" * 10})
+    assert collector.add({"name": "y" * 10})
+    assert not collector.add({"name": "z" * 10})
+    payload = json.loads(collector.render(exhausted=False))
+    assert payload["returned_rows"] == 1
+    assert payload["total_rows_at_least"] == 3
+
+
+def test_collector_byte_budget_counts_utf8_bytes() -> None:
+    """Non-ASCII names count by their encoded size, not their length."""
+    collector = ResultCollector(max_rows=100, max_bytes=30)
+    # Each row is 14 characters, so two would fit by length, but 24 bytes.
+    collector.add({"name": "é" * 10})
+    collector.add({"name": "é" * 10})
+    payload = json.loads(collector.render())
+    assert payload["returned_rows"] == 1
+    assert payload["truncated"] is True
@@ -0,0 +1,107 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from app.result_cache import ResultCache, is_cacheable, normalize_query
+
+
+def test_normalize_query_ignores_whitespace_and_keyword_case() -> None:
+    """Equivalent spellings share a key; literals and identifiers keep case."""
+    a = normalize_query("MATCH (c:City)\n  RETURN c.name  LIMIT 5;")
+    b = normalize_query("match (c:City) return c.name limit 5")
+    assert a == b
+    assert normalize_query("RETURN 'Boston'") != normalize_query("RETURN 'boston'")
+    assert "c.Name" in normalize_query("MATCH (c:City) RETURN c.Name")
+
+
+def test_normalize_query_keeps_case_of_identifiers_named_like_keywords() -> None:
+    """Properties, aliases, labels, parameters and map keys keep their case."""
+    assert normalize_query("RETURN t.Date AS Total") != normalize_query(
+        "RETURN t.date AS Total"
+    )
+    assert normalize_query("RETURN count(t) AS Count") != normalize_query(
+        "RETURN count(t) AS count"
+    )
+    assert normalize_query("MATCH (n:Date) RETURN n") != normalize_query(
+        "MATCH (n:date) RETURN n"
+    )
+    assert normalize_query("RETURN $Type, {Keys: 1}") == "return $Type, {Keys: 1}"
+    assert normalize_query("RETURN COUNT(t) AS n") == "return count(t) as n"
+    assert (
+        normalize_query("WITH t.season AS Count RETURN Count")
+        == "with t.season as Count return Count"
+    )
+
+
+def test_normalize_query_drops_comments_and_trailing_semicolons() -> None:
+    """Comments do not split the cache; `//` inside a literal is kept."""
+    plain = normalize_query("MATCH (c:City) RETURN c.name LIMIT 5")
+    assert normalize_query("MATCH (c:City) // cities\nRETURN c.name LIMIT 5;") == plain
+    assert normalize_query("MATCH (c:City) /* all */ RETURN c.name LIMIT 5") == plain
+    assert normalize_query("MATCH (c:City) RETURN c.name LIMIT 5; // done") == plain
+    assert "'http://x'" in normalize_query("RETURN 'http://x'")
+
+
+def test_only_read_queries_are_cacheable() -> None:
+    """Write clauses disable caching unless they only appear inside literals."""
+    assert is_cacheable(normalize_query("MATCH (p:Product) RETURN count(p)"))
+    assert is_cacheable(normalize_query("MATCH (p {name: 'Set'}) RETURN p"))
+    assert not is_cacheable(normalize_query("MATCH (p) SET p.x = 1"))
+    assert not is_cacheable(normalize_query("CALL db.labels()"))
+
+
+def test_nondeterministic_queries_are_not_cacheable() -> None:
+    """Random values and the current time must not be served from the cache."""
+    for query in (
+        "RETURN rand()",
+        "RETURN randomUUID()",
+        "RETURN timestamp()",
+        "MATCH (t:Transaction) WHERE t.date > datetime() - duration('P7D') RETURN t",
+        "RETURN date({timezone: 'UTC'})",
+        "RETURN datetime.realtime()",
+    ):
+        assert not is_cacheable(normalize_query(query)), query
+    assert is_cacheable(normalize_query("RETURN datetime('2024-01-01')"))
+    assert is_cacheable(normalize_query("RETURN t.timestamp, 'rand()'"))
+
+
+def test_result_cache_evicts_least_recently_used_by_size() -> None:
+    """Memory use stays under max_bytes by dropping the oldest entries."""
+    cache = ResultCache(ttl=60, max_bytes=10, path="")
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    assert cache.get("a") == "12345"
+    cache.put("c", "12345")
+    assert cache.get("b") is None
+    assert cache.get("a") == "12345"
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_result_cache_disk_tier_survives_restart(tmp_path) -> None:
+    """Entries written to the SQLite tier are visible to a new cache."""
+    path = str(tmp_path / "results.sqlite")
+    ResultCache(ttl=60, path=path).put("key", "payload")
+    assert ResultCache(ttl=60, path=path).get("key") == "payload"
+
+
+def test_result_cache_disk_tier_is_size_bounded(tmp_path) -> None:
+    """The SQLite tier drops the oldest entries once over max_disk_bytes."""
+    path = str(tmp_path / "results.sqlite")
+    cache = ResultCache(ttl=60, max_bytes=0, path=path, max_disk_bytes=10)
+    for key in ("a", "b", "c"):
+        cache.put(key, "12345")
+    assert cache.stats()["disk_bytes"] == 10
+    reopened = ResultCache(ttl=60, path=path, max_disk_bytes=10)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == "12345"
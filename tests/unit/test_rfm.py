@@ -0,0 +1,115 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import rfm
+from app.local_graph import LocalGraph
+from app.rfm import RFMTable, quantile_scores
+
+
+def test_quantile_scores_rank_and_keep_ties_together() -> None:
+    scores = quantile_scores(np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10]))
+    assert scores.tolist() == [1, 1, 2, 2, 3, 3, 4, 4, 5, 5]
+    assert len(set(quantile_scores(np.array([1, 1, 1, 1, 9])).tolist()[:4])) == 1
+
+
+def test_segments_follow_recency_and_frequency() -> None:
+    table = RFMTable(
+        ["recent_regular", "recent_first", "lapsed_regular", "lapsed_once"],
+        last_day=np.array([100, 100, 10, 10]),
+        frequency=np.array([20, 1, 20, 1]),
+        monetary=np.array([500.0, 10.0, 400.0, 5.0]),
+        bins=2,
+    )
+    assert table.recency.tolist() == [0, 0, 90, 90]
+    segments = [rfm.SEGMENT_NAMES[i] for i in table.segment]
+    assert segments == ["Champions", "New Customers", "At Risk", "Hibernating"]
+
+    summary = table.summary()
+    assert summary[0]["segment"] == "Champions"
+    assert sum(row["customers"] for row in summary) == 4
+    assert sum(row["revenue_share"] for row in summary) == pytest.approx(1.0)
+    assert table.top_customers("At Risk") == [
+        {
+            "customer": "lapsed_regular",
+            "recency_days": 90,
+            "frequency": 20,
+            "monetary": 400.0,
+            "rfm": "122",
+        }
+    ]
+
+
+def test_local_graph_aggregates_per_customer() -> None:
+    graph = LocalGraph(
+        pd.DataFrame(
+            {
+                "Transaction_ID": ["1", "2", "3"],
+                "Date": [
+                    "2023-01-01 10:00:00",
+                    "2023-01-11 10:00:00",
+                    "2023-01-06 10:00:00",
+                ],
+                "Customer_Name": ["Alice", "Alice", "Bob"],
+                "Customer_Category": ["Student", "Student", "Retiree"],
+                "Product": ["['Milk']", "['Tea']", "['Eggs']"],
+                "Total_Items": [1, 1, 1],
+                "Total_Cost": [10.0, 15.0, 7.5],
+                "Payment_Method": ["Cash", "Cash", "Cash"],
+                "City": ["Boston", "Boston", "Dallas"],
+                "Store_Type": ["Pharmacy", "Pharmacy", "Pharmacy"],
+                "Season": ["Winter", "Winter", "Winter"],
+            }
+        )
+    )
+    table = rfm._table_from_local(graph)
+    assert table.customers == ["Alice", "Bob"]
+    assert table.recency.tolist() == [0, 5]
+    assert table.frequency.tolist() == [2, 1]
+    assert table.monetary.tolist() == [25.0, 7.5]
+
+
+def test_local_graph_counts_undated_transactions_like_neo4j() -> None:
+    """Unparseable dates only affect recency, as with count(t) in Cypher."""
+    frame = pd.DataFrame(
+        {
+            "Transaction_ID": ["1", "2", "3"],
+            "Date": ["2023-01-01 10:00:00", "not a date", "not a date"],
+            "Customer_Name": ["Alice", "Alice", "Bob"],
+            "Customer_Category": ["Student", "Student", "Retiree"],
+            "Product": ["['Milk']", "['Tea']", "['Eggs']"],
+            "Total_Items": [1, 1, 1],
+            "Total_Cost": [10.0, 15.0, 7.5],
+            "Payment_Method": ["Cash", "Cash", "Cash"],
+            "City": ["Boston", "Boston", "Dallas"],
+            "Store_Type": ["Pharmacy", "Pharmacy", "Pharmacy"],
+            "Season": ["Winter", "Winter", "Winter"],
+        }
+    )
+    table = rfm._table_from_local(LocalGraph(frame))
+    assert table.customers == ["Alice"]
+    assert table.frequency.tolist() == [2]
+    assert table.monetary.tolist() == [25.0]
+
+
+def test_unknown_segment_lists_valid_names() -> None:
+    error = json.loads(rfm.rfm_payload("Whales", 5))
+    assert error["error"] == "unknown_segment"
+    assert "Champions" in error["segments"]